@@ -1,11 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
-from .models import get_db, User, UserType
+import threading
+from collections import OrderedDict
+from .models import get_async_db, User, Team, UserType
 from .config import settings
+from .cache import LRUCache
 
 # Configuration
 SECRET_KEY = "your-secret-key"  # In production, use a secure secret key
@@ -25,7 +30,55 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user as cached between requests (not bound to a session)."""
+    id: int
+    email: str
+    user_type: UserType
+    team_id: Optional[int] = None
+    is_blocked: bool = False
+
+# Principals by token subject, so authenticated requests skip the users table
+principal_cache = LRUCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+# Subjects by user id, least recently authenticated first, to invalidate by user
+_subjects_by_user_id: "OrderedDict[int, str]" = OrderedDict()
+_subjects_lock = threading.Lock()
+
+def _remember_subject(user_id: int, subject: str):
+    """
+    Map a user to its token subject, keeping no more entries than the cache
+    can hold. A subject dropped from the map is dropped from the cache too,
+    so every cached principal can still be invalidated by user id.
+    """
+    dropped = []
+    with _subjects_lock:
+        _subjects_by_user_id[user_id] = subject
+        _subjects_by_user_id.move_to_end(user_id)
+        while len(_subjects_by_user_id) > principal_cache.maxsize:
+            dropped.append(_subjects_by_user_id.popitem(last=False)[1])
+    for old_subject in dropped:
+        principal_cache.invalidate(old_subject)
+
+def invalidate_principal(user_id: int):
+    """Drop the cached principal of a user after the user or its team changed."""
+    with _subjects_lock:
+        subject = _subjects_by_user_id.pop(user_id, None)
+    if subject is not None:
+        principal_cache.invalidate(subject)
+
+async def _load_principal(email: str, db: AsyncSession) -> Optional[Principal]:
+    row = (await db.execute(
+        select(User.id, User.email, User.user_type, Team.id, Team.is_blocked)
+        .outerjoin(Team, Team.user_id == User.id)
+        .where(User.email == email)
+    )).first()
+    if row is None:
+        return None
+    user_id, user_email, user_type, team_id, is_blocked = row
+    return Principal(user_id, user_email, user_type, team_id, bool(is_blocked))
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -39,12 +92,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = principal_cache.get(email)
     if user is None:
-        raise credentials_exception
+        version = principal_cache.version(email)
+        user = await _load_principal(email, db)
+        if user is None:
+            raise credentials_exception
+        # Mapped first: an invalidation from now on fails the versioned set
+        _remember_subject(user.id, email)
+        principal_cache.set(email, user, version)
     return user
 
-async def get_current_team(current_user: User = Depends(get_current_user)):
+async def get_current_team(current_user: Principal = Depends(get_current_user)):
     if current_user.user_type != UserType.TEAM:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -52,7 +111,7 @@ async def get_current_team(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-async def get_current_referee(current_user: User = Depends(get_current_user)):
+async def get_current_referee(current_user: Principal = Depends(get_current_user)):
     if current_user.user_type != UserType.REFEREE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -60,7 +119,7 @@ async def get_current_referee(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-async def get_current_admin(current_user: User = Depends(get_current_user)):
+async def get_current_admin(current_user: Principal = Depends(get_current_user)):
     if current_user.user_type != UserType.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,708 @@
+"""
+Micro benchmarks for the database hot paths.
+
+Usage: python -m app.bench <scenario> [...]
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from .config import settings
+from .models import (
+    create_db_engine, create_async_db_engine, get_db, get_write_db, get_async_db,
+    Base, Team, Player, Referee, Tournament, TournamentRegistration, TeamTournament, Phase, Match
+)
+from .bracket import ROUND_NAMES
+from .migrations import upgrade_schema
+from .rankings import rebuild_rankings
+from .scoring import apply_tournament_scores, revert_tournament_scores
+from .synthetic import SyntheticDataset, load
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "bench_baseline.json")
+
+@contextmanager
+def count_statements(engine):
+    """Count the SQL statements sent to the driver while the block runs."""
+    counter = {"statements": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def build_completed_draw(db: Session, draw_size: int, ranked_players: int = 0):
+    """Create a fully played single-elimination tournament and return its id."""
+    now = datetime.now()
+    team = Team(name="Bench Team", is_blocked=False, disciplinary_actions_count=0)
+    referee = Referee(name="Bench", last_name="Referee", level=5, score=0, fiscal_code="BENCH")
+    tournament = Tournament(
+        name="Bench Open", edition="bench", start_date=now, end_date=now + timedelta(days=7),
+        min_level=1, min_referee_level=1, status="active", court_type="hard", spectator_count=0
+    )
+    db.add_all([team, referee, tournament])
+    db.flush()
+
+    db.execute(insert(Player), [
+        {"name": f"Player {i}", "level": 5, "score": i % 500, "team_id": team.id}
+        for i in range(max(draw_size, ranked_players))
+    ])
+    player_ids = [p.id for p in db.query(Player.id).order_by(Player.id).limit(draw_size)]
+
+    alive = player_ids
+    size = draw_size
+    while size >= 2:
+        phase = Phase(tournament_id=tournament.id, name=ROUND_NAMES[size], start_date=now, end_date=now)
+        db.add(phase)
+        db.flush()
+        db.execute(insert(Match), [
+            {
+                "tournament_id": tournament.id, "player1_id": alive[i], "player2_id": alive[i + 1],
+                "referee_id": referee.id, "phase_id": phase.id, "winner_id": alive[i],
+                "match_date": now, "court_number": 1, "score": "6-4, 6-4", "status": "completed",
+            }
+            for i in range(0, size, 2)
+        ])
+        alive = alive[::2]
+        size //= 2
+
+    rebuild_rankings(db)
+    db.commit()
+    return tournament.id
+
+def bench_scoring(args):
+    """Statements issued by tournament completion scoring, per draw size."""
+    print(f"{'draw':>6} {'matches':>8} {'statements':>11} {'ms':>8}")
+    for draw_size in args.draw_sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with Session(bind=engine) as db:
+            tournament_id = build_completed_draw(db, draw_size, args.players)
+            with count_statements(engine) as counter:
+                started = time.perf_counter()
+                apply_tournament_scores(tournament_id, db)
+                db.commit()
+                elapsed = (time.perf_counter() - started) * 1000
+        print(f"{draw_size:>6} {draw_size - 1:>8} {counter['statements']:>11} {elapsed:>8.2f}")
+        engine.dispose()
+
+def _concurrent_load(read_engine, write_engine, seconds: float, readers: int, player_count: int):
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(
+                        select(Player.id, Player.name, Player.score).order_by(Player.score.desc()).limit(50)
+                    ).all()
+                done += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["reads"] += done
+            counts["errors"] += errors
+
+    def writer():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with write_engine.begin() as conn:
+                    conn.execute(
+                        update(Player).where(Player.id == done % player_count + 1).values(score=Player.score + 1)
+                    )
+                done += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts
+
+def bench_concurrency(args):
+    """Read throughput while a writer keeps committing, default vs tuned SQLite profile."""
+    profiles = {
+        "default": settings.model_copy(update={"SQLITE_TUNING": False}),
+        "tuned": settings,
+    }
+    print(f"{'profile':>8} {'reads/s':>9} {'writes/s':>9} {'errors':>7}")
+    for name, config in profiles.items():
+        handle, path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        url = f"sqlite:///{path}"
+        read_engine = create_db_engine(url, config=config)
+        write_engine = create_db_engine(url, writer=True, config=config)
+        try:
+            Base.metadata.create_all(bind=write_engine)
+            with Session(bind=write_engine) as db:
+                db.execute(insert(Player), [
+                    {"name": f"Player {i}", "level": 5, "score": i % 500, "team_id": None}
+                    for i in range(args.players)
+                ])
+                db.commit()
+            counts = _concurrent_load(read_engine, write_engine, args.seconds, args.readers, args.players)
+        finally:
+            read_engine.dispose()
+            write_engine.dispose()
+            _remove_database(path)
+        print(f"{name:>8} {counts['reads'] / args.seconds:>9.0f} "
+              f"{counts['writes'] / args.seconds:>9.0f} {counts['errors']:>7}")
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _endpoint_routes(db: Session, requests: int):
+    """
+    Route name -> list of (method, url, body) calls, built from the ids in the
+    synthetic database. Write routes get one call per distinct target so that
+    every request does the full amount of work.
+    """
+    team_ids = [team_id for (team_id,) in db.query(Team.id).order_by(Team.id)]
+    completed = [t_id for (t_id,) in db.query(Tournament.id).filter(Tournament.status == "completed").order_by(Tournament.id)]
+    places = dict(db.query(Tournament.id, Tournament.capacity - Tournament.registered_count)
+                  .filter(Tournament.status == "upcoming").order_by(Tournament.id))
+    players_by_team = {}
+    for player_id, team_id in db.query(Player.id, Player.team_id).order_by(Player.id):
+        players_by_team.setdefault(team_id, []).append(player_id)
+    player_count = sum(len(team_players) for team_players in players_by_team.values())
+    registered = set(db.query(TournamentRegistration.tournament_id, TournamentRegistration.player_id))
+
+    def cycle(ids):
+        return [ids[i % len(ids)] for i in range(requests)]
+
+    registrations = []
+    for i in range(requests):
+        # Round robin over the tournaments that still have two free places
+        open_ids = [t_id for t_id, free_places in places.items() if free_places >= 2]
+        if not open_ids:
+            break
+        tournament_id = open_ids[i % len(open_ids)]
+        team_id = team_ids[i % len(team_ids)]
+        free = [p for p in players_by_team.get(team_id, []) if (tournament_id, p) not in registered][:2]
+        if free:
+            registered.update((tournament_id, p) for p in free)
+            places[tournament_id] -= len(free)
+            registrations.append(("POST", f"/api/tournaments/{tournament_id}/register-team",
+                                  {"team_id": team_id, "player_ids": free}))
+
+    # Completed draws are reopened, their points taken back, so that completion can be replayed on them
+    to_complete = completed[-min(requests, len(completed)):]
+    db.query(Tournament).filter(Tournament.id.in_(to_complete)).update({"status": "active"})
+    for tournament_id in to_complete:
+        revert_tournament_scores(tournament_id, db)
+    db.commit()
+    # Rolling rankings are read over the last year of the synthetic calendar
+    (last_end,) = db.query(func.max(Tournament.end_date)).one()
+
+    # Matches are added to completed tournaments that the completion route leaves alone
+    untouched = completed[:len(completed) - len(to_complete)] or completed
+    first_phases = dict(db.query(Phase.tournament_id, func.min(Phase.id))
+                        .filter(Phase.tournament_id.in_(untouched)).group_by(Phase.tournament_id))
+    # The highest level qualifies for every tournament
+    (referee_id,) = db.query(Referee.id).order_by(Referee.level.desc(), Referee.id).first()
+    new_matches = [
+        ("POST", f"/api/tournaments/{t}/matches", {
+            "player1_id": 1, "player2_id": 2, "referee_id": referee_id, "phase_id": first_phases[t],
+            "match_date": "2030-01-01T10:00:00", "court_number": 1, "status": "scheduled",
+        })
+        for t in cycle(untouched)
+    ]
+
+    return {
+        "GET /api/players/rankings": [("GET", "/api/players/rankings", None)] * requests,
+        "GET /api/tournaments": [("GET", "/api/tournaments", None)] * requests,
+        "GET /api/tournaments?team_id": [("GET", f"/api/tournaments?team_id={t}", None) for t in cycle(team_ids)],
+        # Pages deep into the lists should cost the same as the first one
+        "GET /api/players/rankings?limit&after": [
+            ("GET", f"/api/players/rankings?limit=50&after={i * 997 % player_count}", None)
+            for i in range(requests)
+        ],
+        "GET /api/tournaments?fields&limit&after": [
+            ("GET", f"/api/tournaments?fields=id,name,status&limit=50&after={t}", None) for t in cycle(completed)
+        ],
+        "GET /api/teams": [("GET", "/api/teams", None)] * requests,
+        "GET /api/referees": [("GET", "/api/referees", None)] * requests,
+        "GET /api/tournaments/{id}/matches": [
+            ("GET", f"/api/tournaments/{t}/matches", None) for t in cycle(completed)
+        ],
+        "GET /api/teams/{id}/tournaments": [("GET", f"/api/teams/{t}/tournaments", None) for t in cycle(team_ids)],
+        "GET /api/tournaments/history?team_id": [
+            ("GET", f"/api/tournaments/history?team_id={t}", None) for t in cycle(team_ids)
+        ],
+        "POST /api/tournaments/{id}/register-team": registrations,
+        "POST /api/tournaments/{id}/matches": new_matches,
+        "PUT /api/tournaments/{id}/complete": [
+            ("PUT", f"/api/tournaments/{t}/complete", None) for t in to_complete
+        ],
+        "PUT /api/tournaments/{id}/rescore": [
+            ("PUT", f"/api/tournaments/{t}/rescore", None) for t in cycle(untouched)
+        ],
+        "GET /api/players/rankings/rolling?as_of": [
+            ("GET", f"/api/players/rankings/rolling?as_of={last_end.isoformat()}&limit=50", None)
+        ] * requests,
+    }
+
+def _synthetic_database(args):
+    """Build a synthetic database in a temporary file; returns (path, url, dataset)."""
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    url = f"sqlite:///{path}"
+    dataset = {
+        "teams": args.teams, "players_per_team": 10, "referees": args.teams,
+        "tournaments": args.tournaments, "draw_size": args.draw_size, "completed_ratio": 0.8, "seed": 42,
+    }
+    load(url, SyntheticDataset(start_date=datetime(2023, 1, 2), **dataset).build())
+    return path, url, dataset
+
+def _remove_database(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+@contextmanager
+def _bench_app(url: str):
+    """
+    The API wired to engines on `url` through dependency overrides.
+    Yields (client, write session factory, counter); the counter tracks
+    statements and execution time on all three engines.
+    """
+    from fastapi.testclient import TestClient
+    from .main import app
+    from .references import reference_cache
+    from .jobs import job_runner
+
+    # Every run starts cold, so that runs against different schemas compare;
+    # the bracket snapshots live in the same backend
+    reference_cache.clear()
+    gc.collect()
+    read_engine = create_db_engine(url)
+    write_engine = create_db_engine(url, writer=True)
+    async_engine = create_async_db_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    ReadSession = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    WriteSession = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+    AsyncSessionBench = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    def bench_db(session_factory):
+        def dependency():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        return dependency
+
+    async def bench_async_db():
+        async with AsyncSessionBench() as db:
+            yield db
+
+    app.dependency_overrides.update({
+        get_db: bench_db(ReadSession),
+        get_write_db: bench_db(WriteSession),
+        get_async_db: bench_async_db,
+    })
+    # The worker is not started: `_drive_endpoints` runs the queued jobs itself
+    session_factory, job_runner.session_factory = job_runner.session_factory, WriteSession
+    counter = {"statements": 0, "db_seconds": 0.0, "started": 0.0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+        counter["started"] = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["db_seconds"] += time.perf_counter() - counter["started"]
+
+    engines = [read_engine, write_engine, async_engine.sync_engine]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+    try:
+        # Start from a checkpointed file: pages left in the WAL by an earlier run slow every read
+        connection = read_engine.raw_connection()
+        try:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            connection.close()
+        # Not used as a context manager: the startup hook would open the configured database
+        yield TestClient(app), WriteSession, counter
+    finally:
+        app.dependency_overrides.clear()
+        job_runner.session_factory = session_factory
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", after_cursor_execute)
+        read_engine.dispose()
+        write_engine.dispose()
+        async_engine.sync_engine.dispose()
+
+def _result(latencies, statements, db_seconds: float, elapsed: float, failures: int) -> dict:
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "statements": max(statements),
+        "statements_mean": sum(statements) / len(statements),
+        "db_ms_mean": db_seconds * 1000 / len(latencies),
+        "failures": failures,
+    }
+
+def _drive_endpoints(url: str, requests: int) -> dict:
+    """
+    Run every route of `_endpoint_routes` in process against `url`, then the
+    background jobs they queued; returns per-route (and per job kind) results.
+    """
+    from .jobs import job_runner
+    from .models import Job
+
+    results = {}
+    with _bench_app(url) as (client, WriteSession, counter):
+        with WriteSession() as db:
+            routes = _endpoint_routes(db, requests)
+        # Requests are sequential, so one counter covers all three engines
+        for name, calls in routes.items():
+            latencies, statements, failures = [], [], 0
+            counter["db_seconds"] = 0.0
+            started = time.perf_counter()
+            for method, path, body in calls:
+                counter["statements"] = 0
+                request_started = time.perf_counter()
+                response = client.request(method, path, json=body)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+                statements.append(counter["statements"])
+                failures += response.status_code >= 400
+            results[name] = _result(latencies, statements, counter["db_seconds"],
+                                    time.perf_counter() - started, failures)
+
+        # One job at a time, so that statements are counted per job
+        with WriteSession() as db:
+            pending = db.query(Job.id, Job.kind).filter(Job.id.in_(job_runner.pending())).order_by(Job.id).all()
+        for kind in dict.fromkeys(kind for _, kind in pending):
+            job_ids = [job_id for job_id, job_kind in pending if job_kind == kind]
+            latencies, statements = [], []
+            counter["db_seconds"] = 0.0
+            started = time.perf_counter()
+            for job_id in job_ids:
+                counter["statements"] = 0
+                job_started = time.perf_counter()
+                job_runner.run(job_id)
+                latencies.append((time.perf_counter() - job_started) * 1000)
+                statements.append(counter["statements"])
+            elapsed = time.perf_counter() - started
+            with WriteSession() as db:
+                failures = db.query(Job).filter(Job.id.in_(job_ids), Job.status != "succeeded").count()
+            results[f"JOB {kind}"] = _result(latencies, statements, counter["db_seconds"], elapsed, failures)
+    return results
+
+def bench_endpoints(args):
+    """
+    Drive the API routes in process against a synthetic database and compare
+    latency and SQL statements per request with the stored baseline.
+    """
+    path, url, dataset = _synthetic_database(args)
+    try:
+        results = _drive_endpoints(url, args.requests)
+    finally:
+        _remove_database(path)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if baseline.get("dataset", dataset) != dataset:
+        print("warning: baseline was recorded on a different dataset")
+    budgets = baseline.get("routes", {})
+
+    print(f"{'route':<42} {'req':>5} {'req/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'sql':>5} {'sql avg':>8}  budget")
+    regressions = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        verdict = "-"
+        if result["failures"]:
+            regressions.append(f"{name}: {result['failures']} failed requests")
+            verdict = "FAILED REQUESTS"
+        elif budget:
+            problems = []
+            if result["statements"] > budget["statements"]:
+                problems.append(f"{result['statements']} statements > {budget['statements']}")
+            if result["p95_ms"] > budget["p95_ms"] * args.latency_tolerance:
+                problems.append(f"p95 {result['p95_ms']:.1f}ms > {budget['p95_ms'] * args.latency_tolerance:.1f}ms")
+            regressions.extend(f"{name}: {problem}" for problem in problems)
+            verdict = "; ".join(problems) or "ok"
+        print(f"{name:<42} {result['requests']:>5} {result['rps']:>8.1f} {result['p50_ms']:>7.2f} "
+              f"{result['p95_ms']:>7.2f} {result['p99_ms']:>7.2f} {result['statements']:>5} "
+              f"{result['statements_mean']:>8.1f}  {verdict}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "dataset": dataset,
+                "routes": {
+                    name: {"p95_ms": round(result["p95_ms"], 2), "statements": result["statements"]}
+                    for name, result in results.items()
+                },
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        raise SystemExit(1)
+
+def bench_registrations(args):
+    """
+    Stress test for team registration: every team submits two players to the
+    same few tournaments from many threads at once, each submission twice.
+    Checks that no duplicate or over-capacity registrations appear and that
+    registered_count matches the rows.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    path, url, dataset = _synthetic_database(args)
+    try:
+        with _bench_app(url) as (client, WriteSession, counter):
+            with WriteSession() as db:
+                targets = [t_id for (t_id,) in db.query(Tournament.id)
+                           .filter(Tournament.status == "upcoming")
+                           .order_by((Tournament.capacity - Tournament.registered_count).desc(), Tournament.id)
+                           .limit(args.targets)]
+                registered = set(db.query(TournamentRegistration.tournament_id, TournamentRegistration.player_id)
+                                 .filter(TournamentRegistration.tournament_id.in_(targets)))
+                players_by_team = {}
+                for player_id, team_id in db.query(Player.id, Player.team_id).order_by(Player.id):
+                    players_by_team.setdefault(team_id, []).append(player_id)
+                rows_before = db.query(TournamentRegistration).count()
+
+            submissions = []
+            for tournament_id in targets:
+                for team_id, team_players in players_by_team.items():
+                    free = [p for p in team_players if (tournament_id, p) not in registered][:2]
+                    if free:
+                        submissions.append((tournament_id, {"team_id": team_id, "player_ids": free}))
+            # The same submission twice, as from a double click or a client retry
+            calls = [submission for submission in submissions for _ in range(2)]
+
+            def register(call):
+                tournament_id, body = call
+                return client.post(f"/api/tournaments/{tournament_id}/register-team", json=body).status_code
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.readers) as executor:
+                statuses = list(executor.map(register, calls))
+            elapsed = time.perf_counter() - started
+
+            with WriteSession() as db:
+                duplicates = db.query(TournamentRegistration.tournament_id, TournamentRegistration.player_id) \
+                    .group_by(TournamentRegistration.tournament_id, TournamentRegistration.player_id) \
+                    .having(func.count() > 1).count()
+                actual = func.count(TournamentRegistration.id)
+                counts = db.query(Tournament.id, Tournament.registered_count, Tournament.capacity, actual) \
+                    .outerjoin(TournamentRegistration, TournamentRegistration.tournament_id == Tournament.id) \
+                    .group_by(Tournament.id).all()
+                rows_added = db.query(TournamentRegistration).count() - rows_before
+                participation = set(db.query(TeamTournament.team_id, TeamTournament.tournament_id, TeamTournament.players))
+                expected_participation = set(
+                    db.query(Player.team_id, TournamentRegistration.tournament_id, func.count())
+                    .join(Player, TournamentRegistration.player_id == Player.id)
+                    .group_by(Player.team_id, TournamentRegistration.tournament_id)
+                )
+    finally:
+        _remove_database(path)
+
+    accepted = [statuses[i] == 200 for i in range(len(calls))]
+    accepted_twice = sum(accepted[i] and accepted[i + 1] for i in range(0, len(calls), 2))
+    players_accepted = sum(len(body["player_ids"]) for (_, body), ok in zip(calls, accepted) if ok)
+    checks = {
+        "no duplicate registrations": duplicates == 0,
+        "no submission accepted twice": accepted_twice == 0,
+        "registered_count matches rows": all(count == rows for _, count, _, rows in counts),
+        "capacity respected": all(rows <= capacity for _, _, capacity, rows in counts),
+        "accepted players were stored": players_accepted == rows_added,
+        "team_tournaments matches registrations": participation == expected_participation,
+    }
+
+    by_status = {}
+    for status in statuses:
+        by_status[status] = by_status.get(status, 0) + 1
+    print(f"{len(calls)} requests on {len(targets)} tournaments from {args.readers} threads: "
+          f"{len(calls) / elapsed:.0f} req/s")
+    print("Responses: " + ", ".join(f"{count} x {status}" for status, count in sorted(by_status.items())))
+    for name, ok in checks.items():
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+# Access-path indexes declared in models.py; dropping them gives the old schema
+ACCESS_PATH_INDEXES = [
+    "ix_players_team_id", "ix_players_ranking", "ix_referees_score",
+    "ix_tournaments_status", "ix_tournaments_spectator_count", "ix_tournaments_court_type_status",
+    "uq_registrations_tournament_player", "ix_registrations_player_tournament",
+    "ix_phases_tournament_name", "ix_matches_referee_id", "ix_matches_tournament_status",
+]
+
+def bench_indexes(args):
+    """
+    Endpoint latency on a database without the access-path indexes, then again
+    after `upgrade_schema` has migrated it.
+    """
+    path, url, dataset = _synthetic_database(args)
+    try:
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            for name in ACCESS_PATH_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        before = _drive_endpoints(url, args.requests)
+        started = time.perf_counter()
+        upgrade_schema(engine)
+        migration = time.perf_counter() - started
+        engine.dispose()
+        after = _drive_endpoints(url, args.requests)
+    finally:
+        _remove_database(path)
+
+    print(f"Migration: {migration:.2f}s")
+    # Statement execution time (up to the first row) isolates the indexes from response serialization
+    print(f"{'route':<42} {'p50 before':>11} {'p50 after':>10} {'exec ms before':>15} {'exec ms after':>14} {'speedup':>8}")
+    for name, result in after.items():
+        old = before[name]
+        print(f"{name:<42} {old['p50_ms']:>11.2f} {result['p50_ms']:>10.2f} {old['db_ms_mean']:>15.3f} "
+              f"{result['db_ms_mean']:>14.3f} {old['db_ms_mean'] / result['db_ms_mean']:>7.1f}x")
+
+def _serialization_rows(count: int, seed: int = 42):
+    """Rankings, tournament and match rows shaped like the endpoint results."""
+    import random
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 2)
+    rankings = [
+        (i, f"Player {i}", rng.randint(1, 7), rng.randint(0, 5000), i // 10 + 1, f"Team {i // 10 + 1}", i)
+        for i in range(1, count + 1)
+    ]
+    tournaments = [
+        (i, f"Synthetic Open {i}", "2023", start + timedelta(days=i), start + timedelta(days=i + 8), 1,
+         rng.randint(1, 3), "completed", "clay", rng.randint(100, 20000), 16, 16)
+        for i in range(1, count + 1)
+    ]
+    matches = [
+        (i, i // 15 + 1, rng.randint(1, 5000), rng.randint(1, 5000), rng.randint(1, 200), i // 8 + 1, "Round of 16",
+         None, start + timedelta(hours=2 * i), i % 8 + 1, "6-4, 7-5", "completed")
+        for i in range(1, count + 1)
+    ]
+    return rankings, tournaments, matches
+
+def _best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def bench_serialization(args):
+    """
+    Response encoding time per 10k rows: the former paths (Pydantic models
+    validated again by the response model, jsonable_encoder, json.dumps)
+    against the rows encoded straight to bytes by orjson.
+    """
+    import asyncio
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from .encoding import encode_rows
+    from .main import MATCH_COLUMNS, MatchResponse, PlayerRanking, TournamentResponse
+
+    rankings, tournaments, matches = _serialization_rows(args.rows)
+    ranking_keys = list(PlayerRanking.model_fields)
+    tournament_keys = list(TournamentResponse.model_fields)
+    match_keys = [column.key for column in MATCH_COLUMNS]
+    ranking_field = create_response_field(name="rankings", type_=List[PlayerRanking])
+
+    def rankings_before():
+        # One model per row, validated and dumped again through response_model
+        content = [PlayerRanking(**dict(zip(ranking_keys, row))) for row in rankings]
+        content = asyncio.run(serialize_response(field=ranking_field, response_content=content, exclude_unset=True))
+        return JSONResponse(content).body
+
+    def tournaments_before():
+        # Dicts without a response model still go through jsonable_encoder
+        return JSONResponse(jsonable_encoder([dict(zip(tournament_keys, row)) for row in tournaments])).body
+
+    def matches_before():
+        payload = [MatchResponse(**dict(zip(match_keys, row))).model_dump(mode="json") for row in matches]
+        return json.dumps(payload, separators=(",", ":")).encode()
+
+    cases = [
+        ("GET /api/players/rankings", rankings_before, lambda: encode_rows(rankings, ranking_keys)),
+        ("GET /api/tournaments", tournaments_before, lambda: encode_rows(tournaments, tournament_keys)),
+        ("GET /api/tournaments/{id}/matches", matches_before, lambda: encode_rows(matches, match_keys)),
+    ]
+    per_10k = 10000 / args.rows
+    print(f"{args.rows} rows, best of {args.repeat}, ms per 10k rows")
+    print(f"{'route':<36} {'before':>9} {'after':>9} {'speedup':>8}")
+    for name, before, after in cases:
+        if json.loads(before()) != json.loads(after()):
+            raise SystemExit(f"{name}: the encodings differ")
+        old = _best_of(args.repeat, before) * 1000 * per_10k
+        new = _best_of(args.repeat, after) * 1000 * per_10k
+        print(f"{name:<36} {old:>9.2f} {new:>9.2f} {old / new:>7.1f}x")
+
+SCENARIOS = {
+    "scoring": bench_scoring,
+    "concurrency": bench_concurrency,
+    "endpoints": bench_endpoints,
+    "indexes": bench_indexes,
+    "registrations": bench_registrations,
+    "serialization": bench_serialization,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="TennisHub database benchmarks")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--draw-sizes", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+    parser.add_argument("--players", type=int, default=10000, help="players in the ranking table")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent reader threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of timed runs")
+    parser.add_argument("--teams", type=int, default=50, help="synthetic teams (endpoints)")
+    parser.add_argument("--tournaments", type=int, default=200, help="synthetic tournaments (endpoints)")
+    parser.add_argument("--draw-size", type=int, default=16, help="synthetic draw size (endpoints)")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route (endpoints)")
+    parser.add_argument("--targets", type=int, default=5, help="tournaments competed for (registrations)")
+    parser.add_argument("--rows", type=int, default=10000, help="rows encoded per run (serialization)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs, the best one counts (serialization)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="stored per-route budgets (endpoints)")
+    parser.add_argument("--update-baseline", action="store_true", help="record this run as the new baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=3.0,
+                        help="allowed p95 slowdown factor over the baseline")
+    args = parser.parse_args()
+    SCENARIOS[args.scenario](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from .models import Match, MatchPhase, Phase
+
+# Phase name of the round that is played by `size` players
+ROUND_NAMES = {
+    128: MatchPhase.FIRST_ROUND.value,
+    64: MatchPhase.ROUND_OF_64.value,
+    32: MatchPhase.ROUND_OF_32.value,
+    16: MatchPhase.ROUND_OF_16.value,
+    8: MatchPhase.QUARTERFINAL.value,
+    4: MatchPhase.SEMIFINAL.value,
+    2: MatchPhase.FINAL.value,
+}
+
+# Phase names from the earliest round to the final
+PHASE_ORDER = list(ROUND_NAMES.values())
+
+def rounds_for(draw_size: int) -> List[str]:
+    """Phase names played in a draw of `draw_size` players, first round first."""
+    if draw_size not in ROUND_NAMES:
+        raise ValueError(f"Unsupported draw size: {draw_size}")
+    return PHASE_ORDER[PHASE_ORDER.index(ROUND_NAMES[draw_size]):]
+
+def next_phase(phase_name: str) -> Optional[str]:
+    """Phase that follows `phase_name`, or None after the final."""
+    if phase_name not in PHASE_ORDER or phase_name == MatchPhase.FINAL.value:
+        return None
+    return PHASE_ORDER[PHASE_ORDER.index(phase_name) + 1]
+
+def seeding_order(draw_size: int) -> List[int]:
+    """
+    Seeds (1-based) in bracket line order, so that consecutive pairs are the
+    first-round matches and the top seeds can only meet in the late rounds.
+    For 8 players: [1, 8, 4, 5, 2, 7, 3, 6].
+    """
+    order = [1]
+    size = 1
+    while size < draw_size:
+        size *= 2
+        order = [seed for top in order for seed in (top, size + 1 - top)]
+    return order
+
+def advance_winner(db: Session, match: Match) -> Optional[Match]:
+    """
+    Place the winner of a completed match in the next phase of the bracket.
+    The next-phase match is created once both feeder matches are completed, and
+    updated in place if it already exists (e.g. after a corrected result).
+    Returns the next-phase match, or None when there is nothing to fill yet or
+    the next match is already completed and keeps its players. Does not commit.
+    """
+    if match.bracket_slot is None or not match.winner_id:
+        return None
+
+    phase_name = db.query(Phase.name).filter(Phase.id == match.phase_id).scalar()
+    following = next_phase(phase_name)
+    if following is None:
+        return None
+    next_phase_row = db.query(Phase).filter(
+        Phase.tournament_id == match.tournament_id,
+        Phase.name == following
+    ).first()
+    if next_phase_row is None:
+        return None
+
+    # Winner of an even slot plays as player 1 in the next round
+    next_slot = match.bracket_slot // 2
+    winner_field = "player1_id" if match.bracket_slot % 2 == 0 else "player2_id"
+
+    next_match = db.query(Match).filter(
+        Match.phase_id == next_phase_row.id,
+        Match.bracket_slot == next_slot
+    ).first()
+    if next_match is not None:
+        if next_match.status == "completed":
+            return None
+        setattr(next_match, winner_field, match.winner_id)
+        return next_match
+
+    sibling = db.query(Match).filter(
+        Match.phase_id == match.phase_id,
+        Match.bracket_slot == match.bracket_slot ^ 1
+    ).first()
+    if sibling is None or sibling.status != "completed" or not sibling.winner_id:
+        return None
+
+    players = {winner_field: match.winner_id}
+    players["player2_id" if winner_field == "player1_id" else "player1_id"] = sibling.winner_id
+    next_match = Match(
+        tournament_id=match.tournament_id,
+        referee_id=match.referee_id,
+        phase_id=next_phase_row.id,
+        match_date=next_phase_row.start_date,
+        court_number=match.court_number,
+        status="scheduled",
+        bracket_slot=next_slot,
+        **players
+    )
+    db.add(next_match)
+    db.flush()
+    return next_match
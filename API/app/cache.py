@@ -0,0 +1,293 @@
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, List, Optional, Tuple
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live.
+    Every key also has an invalidation counter: a reader takes `version(key)`
+    before loading from the database and passes it to `set`, so a value built
+    while a write invalidated the key is not stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._versions = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def version(self, key: Hashable) -> tuple:
+        with self._lock:
+            return (self._epoch, self._versions.get(key, 0))
+
+    def set(self, key: Hashable, value: Any, version: Optional[tuple] = None):
+        with self._lock:
+            if version is not None and version != (self._epoch, self._versions.get(key, 0)):
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._epoch += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+class LocalCacheBackend:
+    """
+    In-process backend for versioned entries: an LRUCache with TTL holds
+    (version, value) pairs and a plain dict the current version of each key.
+    Versions are never evicted, so an old entry cannot come back as current.
+    They only exist in this process: bumps made by other workers are not seen.
+    """
+
+    name = "local"
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        # Identifies this set of counters, which restarts with the process
+        self.epoch = uuid.uuid4().hex[:8]
+        self.created = time.time()
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._bumped = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str) -> tuple:
+        """(current version, value stored for it or None)."""
+        with self._lock:
+            version = self._versions.get(key, 0)
+        entry = self._entries.get(key)
+        value = entry[1] if entry is not None and entry[0] == version else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return version, value
+
+    def store(self, key: str, version: int, value: Any):
+        """Keep `value` for `version` of the key, unless the key was bumped since."""
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                return
+        self._entries.set(key, (version, value))
+
+    def bump(self, key: str):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._bumped[key] = time.time()
+
+    def versions(self, keys: Iterable[str]) -> List[Tuple[int, Optional[float]]]:
+        """(current version, time of the last bump or None) of each key."""
+        with self._lock:
+            return [(self._versions.get(key, 0), self._bumped.get(key)) for key in keys]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        entries = self._entries.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "size": entries["size"],
+                "maxsize": entries["maxsize"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": entries["evictions"],
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+class SQLiteCacheBackend:
+    """
+    Shared backend for versioned entries, standing in for a cache server
+    when several workers run on one host: entries and versions live in a
+    SQLite file that every process opens, so a bump made by one worker is
+    seen by all. Values are pickled. Each key keeps only the entry of one
+    version; the oldest entries are evicted beyond `maxsize`. Hit and miss
+    counters are per process.
+    """
+
+    name = "sqlite"
+
+    # Evictions run every EVICT_EVERY stores rather than on each one
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stores = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_versions "
+                "(key TEXT PRIMARY KEY, version INTEGER NOT NULL, bumped_at REAL) WITHOUT ROWID"
+            )
+            if "bumped_at" not in {row[1] for row in conn.execute("PRAGMA table_info(cache_versions)")}:
+                conn.execute("ALTER TABLE cache_versions ADD COLUMN bumped_at REAL")
+            # Created once per file: counters restart only if the file is removed
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "INSERT OR IGNORE INTO cache_meta (key, value) VALUES ('epoch', ?), ('created', ?)",
+                (uuid.uuid4().hex[:8], repr(time.time()))
+            )
+            meta = dict(conn.execute("SELECT key, value FROM cache_meta"))
+            self.epoch, self.created = meta["epoch"], float(meta["created"])
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                "value BLOB NOT NULL, expires_at REAL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_stored_at ON cache_entries (stored_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit, every statement is its own transaction
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # The versions decide whether a 304 is correct: a bump must outlive a crashed process
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, key: str) -> tuple:
+        # Version and matching entry in one statement
+        row = self._connection().execute(
+            "SELECT coalesce(v.version, 0), e.value, e.expires_at "
+            "FROM (SELECT ? AS key) AS k "
+            "LEFT JOIN cache_versions AS v ON v.key = k.key "
+            "LEFT JOIN cache_entries AS e ON e.key = k.key AND e.version = coalesce(v.version, 0)",
+            (key,)
+        ).fetchone()
+        version, blob, expires_at = row
+        value = None
+        if blob is not None and (expires_at is None or expires_at > time.time()):
+            value = pickle.loads(blob)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return version, value
+
+    def store(self, key: str, version: int, value: Any):
+        now = time.time()
+        # Written only while `version` is still the current one
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, version, value, expires_at, stored_at) "
+            "SELECT ?, ?, ?, ?, ? WHERE ? = coalesce((SELECT version FROM cache_versions WHERE key = ?), 0)",
+            (key, version, pickle.dumps(value), now + self.ttl if self.ttl else None, now, version, key)
+        )
+        with self._lock:
+            self._stores += 1
+            evict = self._stores % self.EVICT_EVERY == 0
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        conn = self._connection()
+        expired = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)).rowcount
+        surplus = conn.execute("SELECT count(*) FROM cache_entries").fetchone()[0] - self.maxsize
+        oldest = 0
+        if surplus > 0:
+            oldest = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY stored_at LIMIT ?)", (surplus,)
+            ).rowcount
+        with self._lock:
+            self.evictions += expired + oldest
+
+    def bump(self, key: str):
+        self._connection().execute(
+            "INSERT INTO cache_versions (key, version, bumped_at) VALUES (?, 1, ?) "
+            "ON CONFLICT (key) DO UPDATE SET version = version + 1, bumped_at = excluded.bumped_at",
+            (key, time.time())
+        )
+
+    def versions(self, keys: Iterable[str]) -> List[Tuple[int, Optional[float]]]:
+        keys = list(keys)
+        if not keys:
+            return []
+        rows = self._connection().execute(
+            f"SELECT key, version, bumped_at FROM cache_versions WHERE key IN ({', '.join('?' * len(keys))})", keys
+        )
+        found = {key: (version, bumped_at) for key, version, bumped_at in rows}
+        return [found.get(key, (0, None)) for key in keys]
+
+    def clear(self):
+        # Versions stay: they are what other processes compare their entries with
+        self._connection().execute("DELETE FROM cache_entries")
+
+    def stats(self) -> dict:
+        size = self._connection().execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "path": self.path,
+                "size": size,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+def create_cache_backend(backend: str, maxsize: int, ttl: Optional[float], path: Optional[str] = None):
+    if backend == "local":
+        return LocalCacheBackend(maxsize=maxsize, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(path, maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,130 @@
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are only gzipped
+    brotli = None
+
+# Responses that must reach the client chunk by chunk, or are not worth compressing
+_PASS_THROUGH_TYPES = ("text/event-stream", "image/", "audio/", "video/", "application/zip", "application/gzip")
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+def _accepted_encoding(accept_encoding: str, brotli_quality: Optional[int]) -> Optional[str]:
+    """The preferred encoding among those the client accepts: br, then gzip."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and brotli_quality is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware: compresses response bodies of at least
+    `minimum_size` bytes with brotli, when the package is installed and the
+    client accepts it, or gzip. Event streams, bodies that already have a
+    Content-Encoding and responses without a body are passed through.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: Optional[int] = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, encoding: str):
+        return _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""), self.brotli_quality)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passing_through = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passing_through
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                passing_through = (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(_PASS_THROUGH_TYPES)
+                    or message["status"] in (204, 304)
+                )
+                if passing_through:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk tells whether to compress
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passing_through:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                initial, start = start, None
+                if not more_body and len(body) < self.minimum_size:
+                    passing_through = True
+                    await send(initial)
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers = MutableHeaders(scope=initial)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    body = compressor.compress(body)
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                await send(initial)
+                await send({**message, "body": body})
+                return
+
+            body = compressor.compress(body)
+            if not more_body:
+                body += compressor.finish()
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
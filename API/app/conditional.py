@@ -0,0 +1,64 @@
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi import HTTPException, Request
+from starlette.datastructures import MutableHeaders
+from .versions import resource_versions
+
+def conditional_get(*tables: str):
+    """
+    Dependency for read endpoints whose response only depends on the URL and
+    on `tables`. The validators come from `resource_versions` alone, so an
+    unchanged resource is answered with 304 before any query runs; otherwise
+    they are left in the request state for `ValidatorHeadersMiddleware`.
+    """
+    def check(request: Request):
+        etag, modified = resource_versions.snapshot(tables)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        # Dates have one second resolution: a Last-Modified in the current
+        # second could also stand for a write later in that second
+        if int(time.time()) > int(modified):
+            headers["Last-Modified"] = formatdate(modified, usegmt=True)
+        if _not_modified(request, etag, modified):
+            raise HTTPException(status_code=304, headers=headers)
+        request.state.validators = headers
+    return check
+
+def _not_modified(request: Request, etag: str, modified: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison; If-Modified-Since is ignored when If-None-Match is sent
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    since = _http_date(request.headers.get("if-modified-since"))
+    return since is not None and int(modified) <= since
+
+def _http_date(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+class ValidatorHeadersMiddleware:
+    """Pure ASGI middleware: adds the validators set by `conditional_get` to 200 responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_validators(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                validators = scope.get("state", {}).get("validators")
+                if validators:
+                    headers = MutableHeaders(scope=message)
+                    for name, value in validators.items():
+                        headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
@@ -4,6 +4,61 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./tennis_hub.db"
+    # Driver URL for the async engine; derived from DATABASE_URL when not set
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # SQLite tuning, applied as PRAGMAs on every new connection
+    SQLITE_TUNING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64000  # negative values are KiB
+    SQLITE_TEMP_STORE: str = "MEMORY"
+
+    # Connection pool for readers; writers share a single serialized connection
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_WRITE_TIMEOUT: int = 30
+
+    # Password hashing: bcrypt cost factor and worker pool limits
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # default: one per CPU (+4, as ThreadPoolExecutor)
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Authenticated principals cached by token subject
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 60
+
+    # Players a tournament accepts unless created with its own capacity
+    TOURNAMENT_CAPACITY: int = 16
+
+    # A running job whose claim is older than this is taken as abandoned by a
+    # stopped process and queued again; keep it above DB_WRITE_TIMEOUT
+    JOB_LEASE_SECONDS: int = 300
+
+    # Tournaments, phases, referees, teams and the pre-encoded bracket snapshots
+    # read through a cache. "local" is per process; "sqlite" is a file shared
+    # by the workers of one host
+    REFERENCE_CACHE_BACKEND: str = "local"
+    REFERENCE_CACHE_SIZE: int = 10000
+    REFERENCE_CACHE_TTL: int = 300
+    REFERENCE_CACHE_PATH: str = "./reference_cache.db"
+
+    # Per-request SQL instrumentation: a statement shape repeated this many
+    # times in one request is reported as a likely N+1
+    SQL_INSTRUMENTATION: bool = True
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Statements slower than this are kept, with their query plan, in a ring buffer
+    SLOW_QUERY_THRESHOLD_MS: float = 50.0
+    SLOW_QUERY_LOG_SIZE: int = 500
+    SLOW_QUERY_EXPLAIN: bool = True
+
+    # Response compression above a size threshold; brotli when the package is installed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
     
     # JWT
     SECRET_KEY: str = "your-secret-key"  # In production, use a secure secret key
@@ -19,4 +74,12 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
+    @property
+    def async_database_url(self) -> str:
+        if self.ASYNC_DATABASE_URL:
+            return self.ASYNC_DATABASE_URL
+        if self.DATABASE_URL.startswith("sqlite://"):
+            return self.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        return self.DATABASE_URL
+
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,19 @@
+from typing import Optional, Sequence
+import orjson
+from fastapi import Response
+
+def encode_rows(rows: Sequence, keys: Optional[Sequence[str]] = None) -> bytes:
+    """
+    JSON array of objects written straight from result tuples: no model is
+    built or validated and orjson encodes the whole list in one call.
+    `keys` defaults to the column labels of the rows; values past the last
+    key (such as a pagination cursor) are left out.
+    """
+    if not rows:
+        return b"[]"
+    if keys is None:
+        keys = rows[0]._fields
+    return orjson.dumps([dict(zip(keys, row)) for row in rows])
+
+def rows_response(rows: Sequence, keys: Optional[Sequence[str]] = None) -> Response:
+    return Response(content=encode_rows(rows, keys), media_type="application/json")
@@ -0,0 +1,290 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists render one placeholder per value; collapse them so that
+# `IN (?, ?)` and `IN (?, ?, ?)` count as the same statement shape
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(?)", " ".join(statement.split()))
+
+class RequestStats:
+    """SQL activity of one HTTP request."""
+
+    __slots__ = ("request", "statements", "db_seconds", "slowest_seconds", "slowest_statement", "shapes")
+
+    def __init__(self, request: Optional[str] = None):
+        self.request = request
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> dict:
+        """Statement shapes issued at least `threshold` times: the N+1 pattern."""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+# Set by the middleware for the duration of a request. Sync endpoints run in
+# the threadpool with a copy of the context, which shares the same object.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class SlowQueryLog:
+    """
+    Bounded ring buffer of statements slower than `threshold_ms`, each stored
+    with its parameters and, on SQLite, the EXPLAIN QUERY PLAN rows.
+    """
+
+    # Statements whose plan says nothing useful
+    _NO_PLAN = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "EXPLAIN", "SAVEPOINT", "RELEASE")
+
+    def __init__(self, threshold_ms: float, maxsize: int, explain: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self._entries = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def record(self, conn, cursor, statement: str, parameters, executemany: bool, seconds: float):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        plan = None
+        if self.explain and conn.dialect.name == "sqlite" and not statement.lstrip().upper().startswith(self._NO_PLAN):
+            plan = self._query_plan(conn, statement, parameters)
+        stats = current_request.get()
+        entry = {
+            "at": datetime.now().isoformat(timespec="milliseconds"),
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement,
+            "shape": statement_shape(statement),
+            "parameters": _loggable(statement, parameters),
+            "executemany": executemany,
+            "request": stats.request if stats is not None else None,
+            "plan": plan,
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+    @staticmethod
+    def _query_plan(conn, statement: str, parameters):
+        # A separate cursor on the same connection, so the plan is taken inside
+        # the same transaction and the result of the original cursor is untouched
+        plan_cursor = conn.connection.cursor()
+        try:
+            plan_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in plan_cursor.fetchall()]
+        except Exception as e:
+            return [f"unavailable: {e}"]
+        finally:
+            plan_cursor.close()
+
+    def entries(self) -> list:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def aggregate(self) -> list:
+        """Entries grouped by statement shape, costliest first."""
+        groups = {}
+        for entry in self.entries():
+            group = groups.get(entry["shape"])
+            if group is None:
+                group = groups[entry["shape"]] = {
+                    "shape": entry["shape"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "requests": set(), "plan": None, "full_scan": False, "last_seen": None,
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            group["last_seen"] = entry["at"]
+            if entry["request"]:
+                group["requests"].add(entry["request"])
+            if entry["plan"] is not None:
+                group["plan"] = entry["plan"]
+                group["full_scan"] = any(_is_full_scan(detail) for detail in entry["plan"])
+
+        result = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+        for group in result:
+            group["total_ms"] = round(group["total_ms"], 3)
+            group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+            group["requests"] = sorted(group["requests"])
+        return result
+
+def _loggable(statement: str, parameters) -> list:
+    # Credentials never leave the process; other long values are cut short
+    values = list(parameters or ())[:20]
+    if "password" in statement:
+        return ["<redacted>"] * len(values)
+    return [repr(value)[:80] for value in values]
+
+_FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+( AS \w+)?$")
+
+def _is_full_scan(detail: str) -> bool:
+    # "SCAN matches" reads the whole table; "SCAN matches USING INDEX ..." does not
+    return bool(_FULL_SCAN.match(detail))
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    maxsize=settings.SLOW_QUERY_LOG_SIZE,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if seconds * 1000 >= slow_query_log.threshold_ms:
+        slow_query_log.record(conn, cursor, statement, parameters, executemany, seconds)
+
+def instrument_engine(engine):
+    """Attach the per-request statement hooks to a (sync) engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class RequestMetrics:
+    """Per-route counters, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._responses = Counter()
+        self._routes = defaultdict(lambda: {
+            "requests": 0, "seconds": 0.0, "statements": 0, "db_seconds": 0.0,
+            "max_statements": 0, "n_plus_one": 0,
+        })
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats, n_plus_one: bool):
+        with self._lock:
+            self._responses[(method, route, status)] += 1
+            totals = self._routes[(method, route)]
+            totals["requests"] += 1
+            totals["seconds"] += seconds
+            totals["statements"] += stats.statements
+            totals["db_seconds"] += stats.db_seconds
+            totals["max_statements"] = max(totals["max_statements"], stats.statements)
+            totals["n_plus_one"] += n_plus_one
+
+    def render(self) -> str:
+        with self._lock:
+            responses = dict(self._responses)
+            routes = {key: dict(values) for key, values in self._routes.items()}
+
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        def per_route(field):
+            return [({"method": method, "route": route}, values[field]) for (method, route), values in sorted(routes.items())]
+
+        family("tennishub_http_requests_total", "counter", "HTTP responses by route and status.",
+               [({"method": m, "route": r, "status": s}, count) for (m, r, s), count in sorted(responses.items())])
+        family("tennishub_http_request_duration_seconds_total", "counter", "Time spent serving requests.",
+               per_route("seconds"))
+        family("tennishub_db_statements_total", "counter", "SQL statements issued while serving requests.",
+               per_route("statements"))
+        family("tennishub_db_time_seconds_total", "counter", "Time spent executing SQL statements.",
+               per_route("db_seconds"))
+        family("tennishub_db_statements_per_request_max", "gauge", "Most SQL statements issued by one request.",
+               per_route("max_statements"))
+        family("tennishub_db_n_plus_one_requests_total", "counter",
+               "Requests that repeated one statement shape at least N_PLUS_ONE_THRESHOLD times.",
+               per_route("n_plus_one"))
+        return "\n".join(lines) + "\n"
+
+request_metrics = RequestMetrics()
+
+class QueryInstrumentationMiddleware:
+    """
+    Pure ASGI middleware: collects the SQL activity of each HTTP request,
+    reports it in response headers and feeds `request_metrics`.
+    Streaming responses report the statements issued before the first byte.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = settings.N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._route_paths = None
+
+    def _route(self, scope) -> str:
+        # The router stores the matched endpoint in the (shared) scope
+        if self._route_paths is None and "app" in scope:
+            self._route_paths = {
+                getattr(route, "endpoint", None): route.path for route in scope["app"].routes
+            }
+        return (self._route_paths or {}).get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(f"{scope['method']} {scope['path']}")
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                repeated = stats.repeated_shapes(self.n_plus_one_threshold)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-statements", str(stats.statements).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.db_seconds * 1000:.3f}".encode()))
+                headers.append((b"x-db-slowest-ms", f"{stats.slowest_seconds * 1000:.3f}".encode()))
+                headers.append((b"server-timing", f"db;dur={stats.db_seconds * 1000:.3f}".encode()))
+                if repeated:
+                    headers.append((b"x-db-repeated-statements", str(max(repeated.values())).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_request.reset(token)
+            route = self._route(scope)
+            repeated = stats.repeated_shapes(self.n_plus_one_threshold)
+            if repeated:
+                shape, count = max(repeated.items(), key=lambda item: item[1])
+                logger.warning("Possible N+1 in %s %s: %d x %s", scope["method"], route, count, shape)
+            if stats.slowest_statement is not None:
+                logger.debug("%s %s: %d statements, %.1f ms in the database, slowest %.1f ms: %s",
+                             scope["method"], route, stats.statements, stats.db_seconds * 1000,
+                             stats.slowest_seconds * 1000, stats.slowest_statement)
+            request_metrics.observe(scope["method"], route, status, time.perf_counter() - started,
+                                    stats, bool(repeated))
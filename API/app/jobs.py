@@ -0,0 +1,163 @@
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .config import settings
+from .models import Job, WriteSessionLocal
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ("queued", "running")
+
+class JobRunner:
+    """
+    In-process runner for the jobs persisted in the jobs table. One worker
+    thread runs them in submission order, since SQLite serializes the writes
+    anyway. A handler's changes and the final state of its job are committed
+    together, so a job cut short by a restart simply runs again: handlers
+    must be idempotent.
+
+    Every API worker process has a runner. A job is claimed under the
+    runner's name with a lease; only running jobs whose lease has expired are
+    queued again, so a worker starting up never takes over the job another
+    live worker is running. The handler's transaction holds the database
+    write lock for the whole run, which is why the lease does not need to be
+    renewed: a requeue cannot happen before the run commits.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = WriteSessionLocal,
+                 lease_seconds: int = settings.JOB_LEASE_SECONDS):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, kind: str, handler: Callable[[Session, dict], dict]):
+        """`handler(db, payload)` does the work without committing and returns the job result."""
+        self._handlers[kind] = handler
+
+    def submit(self, db: Session, kind: str, key: str, payload: dict) -> Job:
+        """
+        Persist a job and queue it, unless a job with the same key is already
+        queued or running: that one is returned instead, so a retried request
+        does not queue the work twice. Commits `db`.
+        """
+        db.execute(
+            sqlite_insert(Job)
+            .values(kind=kind, key=key, status="queued", payload=payload, attempts=0, created_at=datetime.now())
+            .on_conflict_do_nothing(index_elements=["key"], index_where=Job.status.in_(ACTIVE))
+        )
+        job = db.query(Job).filter(Job.key == key, Job.status.in_(ACTIVE)).one()
+        # Detached, so the commit does not expire it: reading it afterwards
+        # must not open another (write) transaction
+        db.expunge(job)
+        db.commit()
+        self._queue.put(job.id)
+        return job
+
+    def start(self):
+        """Queue the unfinished jobs, including those of stopped processes, and start the worker."""
+        if self._thread is not None:
+            return
+        for job_id in self.pending():
+            self._queue.put(job_id)
+        self._thread = threading.Thread(target=self._work, name="jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Let the worker finish the queued jobs, then stop it."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def pending(self) -> List[int]:
+        """Ids of the queued jobs, after queueing again the running ones whose lease has expired."""
+        db = self.session_factory()
+        try:
+            # Their runner stopped before committing, so nothing of the work is
+            # left. No lease: claimed before leases existed
+            db.execute(
+                update(Job)
+                .where(Job.status == "running",
+                       or_(Job.lease_expires_at.is_(None), Job.lease_expires_at < datetime.now()))
+                .values(status="queued", owner=None, lease_expires_at=None)
+            )
+            job_ids = [job_id for (job_id,) in db.query(Job.id).filter(Job.status == "queued").order_by(Job.id)]
+            db.commit()
+            return job_ids
+        finally:
+            db.close()
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.lease_seconds)
+            except queue.Empty:
+                # Idle for a whole lease: pick up what a stopped worker left behind
+                try:
+                    for job_id in self.pending():
+                        self._queue.put(job_id)
+                except Exception:
+                    logger.exception("Unfinished jobs could not be collected")
+                continue
+            if job_id is None:
+                return
+            try:
+                self.run(job_id)
+            except Exception:
+                logger.exception("Job %s could not be run", job_id)
+
+    def run(self, job_id: int):
+        """Claim and run one queued job in the calling thread."""
+        db = self.session_factory()
+        try:
+            # A job queued twice is only claimed once
+            now = datetime.now()
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", attempts=Job.attempts + 1, started_at=now, owner=self.owner,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return
+
+            job = db.get(Job, job_id)
+            kind = job.kind
+            handler = self._handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler for {kind} jobs")
+                result = handler(db, job.payload)
+            except Exception as e:
+                db.rollback()
+                logger.exception("Job %s (%s) failed", job_id, kind)
+                db.execute(
+                    update(Job)
+                    .where(Job.id == job_id)
+                    .values(status="failed", error=str(e), finished_at=datetime.now(), lease_expires_at=None)
+                )
+                db.commit()
+                return
+
+            job.status = "succeeded"
+            job.result = result
+            job.finished_at = datetime.now()
+            job.lease_expires_at = None
+            db.commit()
+        finally:
+            db.close()
+
+job_runner = JobRunner()
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+import orjson
+
+class MatchFeed:
+    """
+    In-process publish/subscribe hub for live match updates.
+    Each update is encoded once as a Server-Sent Event and handed to every
+    subscriber of the tournament, so N spectators cost no extra queries.
+    Publishing is thread safe: sync endpoints run in the threadpool while the
+    subscribers wait on the event loop.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, tournament_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[tournament_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, tournament_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(tournament_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(tournament_id, None)
+
+    def has_subscribers(self, tournament_id: int) -> bool:
+        return bool(self._subscribers.get(tournament_id))
+
+    def subscriber_count(self, tournament_id: int) -> int:
+        return len(self._subscribers.get(tournament_id, ()))
+
+    def publish(self, tournament_id: int, event: str, data: List[dict]):
+        message = f"event: {event}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers.get(tournament_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                self.unsubscribe(tournament_id, queue)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: bytes):
+        # A slow client loses its oldest pending update rather than blocking the feed
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+live_feed = MatchFeed()
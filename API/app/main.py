@@ -1,17 +1,38 @@
-from fastapi import FastAPI, HTTPException, Depends, Form, Query
+from fastapi import FastAPI, HTTPException, Depends, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
-import random # Added for shuffling players
+import asyncio
+import logging
+import orjson
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, event, insert, select, update
 from sqlalchemy.sql import func
 from .models import (
-    Base, SessionLocal, get_db,
-    UserType, User, Team, Player, Referee, Tournament, Match, MatchPhase, Phase, TournamentRegistration
+    Base, SessionLocal, engine, write_engine, async_engine, get_db, get_write_db, get_async_db,
+    UserType, User, Team, Player, PlayerRank, Referee, Tournament, Match, MatchPhase, Phase, TournamentRegistration,
+    TeamTournament, Job
 )
+from . import rankings
+from .scoring import adjust_score, apply_tournament_scores, rescore_tournament, revert_tournament_scores
+from .registrations import register_players, release_places, leave_team_tournament
+from .pagination import FIELDS_DESCRIPTION, MAX_PAGE_SIZE, keyset, model_fields, project, set_next_cursor
+from .encoding import rows_response
+from .bracket import ROUND_NAMES, rounds_for, seeding_order, advance_winner
+from .migrations import upgrade_schema
+from .live import live_feed
+from .references import reference_cache
+from .jobs import job_runner
+from .auth import invalidate_principal, principal_cache
+from .passwords import password_hasher, PasswordHasherBusy
+from .config import settings
+from .instrumentation import QueryInstrumentationMiddleware, instrument_engine, request_metrics, slow_query_log
+from .versions import resource_versions
+from .conditional import ValidatorHeadersMiddleware, conditional_get
+from .compression import CompressionMiddleware
 
 # Pydantic models
 class UserBase(BaseModel):
@@ -36,6 +57,7 @@ class TournamentCreate(BaseModel):
     min_level: int
     min_referee_level: int
     court_type: str
+    capacity: Optional[int] = Field(None, ge=1)
 
 class TournamentResponse(BaseModel):
     id: int
@@ -48,6 +70,8 @@ class TournamentResponse(BaseModel):
     status: str
     court_type: str
     spectator_count: int
+    registered_count: int
+    capacity: int
 
     class Config:
         from_attributes = True
@@ -84,10 +108,19 @@ class MatchCreate(BaseModel):
     status: str
     score: Optional[str] = None
     winner_id: Optional[int] = None
+    bracket_slot: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class BulkMatchCreate(BaseModel):
+    matches: List[MatchCreate]
+
+class DrawCreate(BaseModel):
+    referee_ids: Optional[List[int]] = None  # Defaults to every referee with the required level
+    courts: int = Field(4, ge=1)
+    match_interval_hours: int = 2
+
 class MatchUpdate(BaseModel):
     score: Optional[str] = None
     winner_id: Optional[int] = None
@@ -108,17 +141,28 @@ class TeamTournamentRegistration(BaseModel):
     player_ids: List[int]
 
 class PlayerRanking(BaseModel):
+    # Optional so that a `fields=` projection can return a subset
     id: int
-    name: str
-    level: int
-    score: int
-    team_id: int
+    name: Optional[str] = None
+    level: Optional[int] = None
+    score: Optional[int] = None
+    team_id: Optional[int] = None
     team_name: Optional[str] = None
-    ranking: int
+    ranking: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class RollingPlayerRanking(BaseModel):
+    # Optional so that a `fields=` projection can return a subset
+    id: int
+    name: Optional[str] = None
+    level: Optional[int] = None
+    team_id: Optional[int] = None
+    team_name: Optional[str] = None
+    points: Optional[int] = None
+    ranking: Optional[int] = None
+
 class PlayerResponse(BaseModel):
     id: int
     name: str
@@ -130,6 +174,20 @@ class PlayerResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class RefereeResponse(BaseModel):
     id: int
     name: str
@@ -141,8 +199,11 @@ class RefereeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+logger = logging.getLogger(__name__)
+
 # FastAPI app
-app = FastAPI()
+# orjson encodes the responses that still go through FastAPI's serialization
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -151,8 +212,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Statements", "X-DB-Time-Ms", "X-DB-Slowest-Ms", "X-DB-Repeated-Statements", "Server-Timing",
+                    "X-Next-After", "ETag", "Last-Modified"],
+)
+app.add_middleware(ValidatorHeadersMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
 )
 
+if settings.SQL_INSTRUMENTATION:
+    for db_engine in (engine, write_engine, async_engine.sync_engine):
+        instrument_engine(db_engine)
+    app.add_middleware(QueryInstrumentationMiddleware)
+
+@app.on_event("startup")
+def prepare_database():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    try:
+        rankings.ensure_rankings(db)
+    finally:
+        db.close()
+    # Jobs left queued or running by the previous process run again
+    job_runner.start()
+
+@app.on_event("shutdown")
+def stop_jobs():
+    job_runner.stop()
+
 # Test endpoint
 @app.get("/api/test")
 def test_endpoint():
@@ -164,20 +254,24 @@ async def login(
     email: str = Form(...),
     password: str = Form(...),
     user_type: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        print(f"Login attempt - Email: {email}, Type: {user_type}")  # Debug log
-        user = db.query(User).filter(User.email == email).first()
+        user = (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Simple password comparison for school project
-        if user.password != password:
+        valid, needs_rehash = await password_hasher.verify(password, user.password)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid password")
             
         if user.user_type.value != user_type:
             raise HTTPException(status_code=403, detail="Invalid user type")
+
+        # Upgrade plaintext or outdated hashes on a successful login
+        if needs_rehash:
+            user.password = await password_hasher.hash(password)
+            await db.commit()
         
         response_data = {
             "message": "Login successful",
@@ -187,40 +281,87 @@ async def login(
         
         # If user is a team, include team information
         if user.user_type == UserType.TEAM:
-            team = db.query(Team).filter(Team.user_id == user.id).first()
+            team = (await db.execute(select(Team).where(Team.user_id == user.id))).scalar_one_or_none()
             if team:
                 response_data["team_id"] = team.id
                 response_data["team_name"] = team.name
                 response_data["is_blocked"] = team.is_blocked
         
         return response_data
+    except HTTPException:
+        raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many login attempts, retry shortly", headers={"Retry-After": "1"})
     except Exception as e:
-        print(f"Login error: {str(e)}")  # Debug log
+        logger.exception("Login failed for %s", email)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Per-route request and SQL statement counters in Prometheus text format."""
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/slow-queries")
+def get_slow_queries(recent: int = Query(0, ge=0, le=settings.SLOW_QUERY_LOG_SIZE)):
+    """
+    Slow statements grouped by shape, costliest first, with the latest
+    EXPLAIN QUERY PLAN of each. `recent` also returns the last N raw entries.
+    """
+    result = {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "statements": slow_query_log.aggregate(),
+    }
+    if recent:
+        result["recent"] = slow_query_log.entries()[-recent:]
+    return result
+
+@app.delete("/api/admin/slow-queries")
+def clear_slow_queries():
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
+@app.get("/api/admin/resource-versions")
+def get_resource_versions():
+    """Write counters and last commit time of the tables behind the conditional GET endpoints."""
+    return resource_versions.stats()
+
+@app.get("/api/auth/principal-cache")
+def get_principal_cache_stats():
+    """Hit/miss counters of the authenticated principal cache."""
+    return principal_cache.stats()
+
+@app.get("/api/admin/reference-cache")
+def get_reference_cache_stats():
+    """Hit ratio, size and evictions of the tournament/phase/referee/team cache."""
+    return reference_cache.stats()
+
+@app.get("/api/auth/password-hasher")
+def get_password_hasher_stats():
+    """Worker pool and queue-depth metrics of the password hasher."""
+    return password_hasher.stats()
+
 # Team endpoints
 @app.post("/api/teams/register")
 async def register_team(
     name: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        print(f"Registration attempt - Name: {name}, Email: {email}")  # Debug log
-        
         # Check if email already exists
-        if db.query(User).filter(User.email == email).first():
+        existing = await db.execute(select(User.id).where(User.email == email))
+        if existing.first():
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create user
         db_user = User(
             email=email,
-            password=password,  # In a real app, this should be hashed
+            password=await password_hasher.hash(password),
             user_type=UserType.TEAM
         )
         db.add(db_user)
-        db.flush()  # Flush to get the user ID
+        await db.flush()  # Flush to get the user ID
         
         # Create team
         db_team = Team(
@@ -230,121 +371,163 @@ async def register_team(
             disciplinary_actions_count=0
         )
         db.add(db_team)
-        db.commit()
+        await db.commit()
         
         return {
             "message": "Team registered successfully",
             "team_id": db_team.id,
             "user_id": db_user.id
         }
+    except HTTPException:
+        await db.rollback()
+        raise
+    except PasswordHasherBusy:
+        await db.rollback()
+        raise HTTPException(status_code=503, detail="Too many registrations, retry shortly", headers={"Retry-After": "1"})
     except Exception as e:
-        db.rollback()
-        print(f"Registration error: {str(e)}")  # Debug log
+        await db.rollback()
+        logger.exception("Team registration failed for %s", email)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Player endpoints
 @app.post("/api/players")
-def register_player(player: PlayerCreate, db: Session = Depends(get_db)):
+def register_player(player: PlayerCreate, db: Session = Depends(get_write_db)):
     # Verify team exists
-    team = db.query(Team).filter(Team.id == player.team_id).first()
+    team = reference_cache.team(db, player.team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     
     db_player = Player(**player.dict())
     db.add(db_player)
+    db.flush()
+    rankings.apply_score_changes(db, [db_player.id])
     db.commit()
     db.refresh(db_player)
     return db_player
 
-@app.get("/api/players/rankings", response_model=List[PlayerRanking])
+@app.get(
+    "/api/players/rankings", response_model=List[PlayerRanking], response_model_exclude_unset=True,
+    dependencies=[Depends(conditional_get("players", "teams", "player_rankings", "tournaments", "tournament_registrations"))]
+)
 def get_player_rankings(
     court_type: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last ranking position of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
     Retrieve a list of all players sorted by their scores in descending order.
     Can be filtered by court type.
+    Positions are read from the materialized player_rankings table and pages
+    are cut on them.
     """
-    # Base query to get all players with their team names
-    query = db.query(Player, Team.name.label('team_name')) \
-              .outerjoin(Team, Player.team_id == Team.id)
+    ranked = select(PlayerRank.player_id, PlayerRank.position, PlayerRank.position.label("ranking"))
 
     # If court_type is specified, filter by completed matches in that court type
     if court_type is not None:
-        # Get player IDs who have completed matches in the specified court type
-        player_ids = db.query(Player.id) \
-            .join(TournamentRegistration, Player.id == TournamentRegistration.player_id) \
+        # Players registered to a completed tournament on the specified court type
+        player_ids = select(TournamentRegistration.player_id) \
             .join(Tournament, TournamentRegistration.tournament_id == Tournament.id) \
-            .filter(Tournament.court_type == court_type, Tournament.status == 'completed') \
-            .distinct() \
-            .all()
-        
-        if player_ids:
-            # Filter players to only those who have matches in the specified court type
-            query = query.filter(Player.id.in_([p[0] for p in player_ids]))
-        else:
-            # If no players found for this court type, return empty list
-            return []
-
-    # Order by score descending
-    query = query.order_by(Player.score.desc())
-
-    results = query.all()
-    
-    rankings = []
-    for rank, (player, team_name) in enumerate(results, 1):
-        rankings.append(PlayerRanking(
-            id=player.id,
-            name=player.name,
-            level=player.level,
-            score=player.score,
-            team_id=player.team_id,
-            team_name=team_name or "N/A",
-            ranking=rank
-        ))
-    
-    return rankings
+            .where(Tournament.court_type == court_type, Tournament.status == 'completed')
+        # Filtered lists are ranked among the filtered players only
+        ranked = select(
+            PlayerRank.player_id, PlayerRank.position,
+            func.row_number().over(order_by=PlayerRank.position).label("ranking")
+        ).where(PlayerRank.player_id.in_(player_ids))
+    ranked = ranked.subquery()
+
+    columns = project({
+        "id": Player.id,
+        "name": Player.name,
+        "level": Player.level,
+        "score": Player.score,
+        "team_id": Player.team_id,
+        "team_name": func.coalesce(Team.name, "N/A"),
+        "ranking": ranked.c.ranking,
+    }, fields)
+    query = db.query(*columns, ranked.c.position.label("_position")) \
+              .select_from(ranked) \
+              .join(Player, ranked.c.player_id == Player.id) \
+              .outerjoin(Team, Player.team_id == Team.id)
+    rows = keyset(query, ranked.c.position, limit, after).all()
+    # The trailing _position column is the cursor and is left out of the body
+    response = rows_response(rows, [column.key for column in columns])
+    set_next_cursor(response, rows, limit, lambda row: row._position)
+    return response
+
+@app.get("/api/players/rankings/rolling", response_model=List[RollingPlayerRanking], response_model_exclude_unset=True)
+def get_rolling_rankings(
+    weeks: int = Query(52, ge=1, le=520),
+    as_of: Optional[datetime] = Query(None, description="End of the window, defaults to now"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last ranking position of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """
+    Players ranked by the points earned in the last `weeks` weeks, summed from
+    the score ledger; players without points in the window are left out.
+    """
+    ranked = rankings.rolling_rankings(as_of or datetime.now(), weeks).subquery()
+    columns = project({
+        "id": Player.id,
+        "name": Player.name,
+        "level": Player.level,
+        "team_id": Player.team_id,
+        "team_name": func.coalesce(Team.name, "N/A"),
+        "points": ranked.c.points,
+        "ranking": ranked.c.position,
+    }, fields)
+    query = db.query(*columns, ranked.c.position.label("_position")) \
+              .select_from(ranked) \
+              .join(Player, ranked.c.player_id == Player.id) \
+              .outerjoin(Team, Player.team_id == Team.id)
+    rows = keyset(query, ranked.c.position, limit, after).all()
+    response = rows_response(rows, [column.key for column in columns])
+    set_next_cursor(response, rows, limit, lambda row: row._position)
+    return response
 
 @app.get("/api/players/{player_id}", response_model=PlayerResponse)
 def get_player_profile(player_id: int, db: Session = Depends(get_db)):
-    player = db.query(Player).filter(Player.id == player_id).first()
+    # Plain columns: validated once by the response model, no ORM state copied
+    player = db.query(*project(model_fields(Player), None), Team.name.label("team_name")) \
+               .outerjoin(Team, Player.team_id == Team.id) \
+               .filter(Player.id == player_id) \
+               .first()
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
-    
-    team = db.query(Team).filter(Team.id == player.team_id).first()
-    player_data = player.__dict__
-    player_data["team_name"] = team.name if team else None
-
-    return PlayerResponse(**player_data)
+    return player._asdict()
 
 # Tournament endpoints
-@app.get("/api/tournaments")
-def get_tournaments(team_id: Optional[int] = None, db: Session = Depends(get_db)):
-    query = db.query(Tournament)
+@app.get("/api/tournaments", dependencies=[Depends(conditional_get("tournaments"))])
+def get_tournaments(
+    team_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last tournament id of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    query = db.query(*project(model_fields(Tournament), fields))
 
     if team_id is not None:
-        # Filter out tournaments with 16 or more registered players
-        # Count players registered for each tournament
-        player_counts = db.query(
-            TournamentRegistration.tournament_id,
-            func.count(TournamentRegistration.player_id).label('player_count')
-        ).group_by(TournamentRegistration.tournament_id).subquery()
-
-        # Join with player_counts and filter
-        query = query.outerjoin(player_counts, Tournament.id == player_counts.c.tournament_id)
-        query = query.filter(
-            or_(
-                player_counts.c.player_count < 16,
-                player_counts.c.player_count == None # Include tournaments with no registered players yet
-            )
-        )
+        # Only tournaments a team can still register for (ix_tournaments_free_places)
+        query = query.filter(Tournament.capacity - Tournament.registered_count > 0)
+
+    return _page(keyset(query, Tournament.id, limit, after), limit)
 
-    tournaments = query.all()
-    print(f"Fetched tournaments: {tournaments}") # Added for debugging
-    return tournaments
+def _page(query, limit: Optional[int]) -> Response:
+    """
+    A keyset-paginated projection encoded straight from its rows, with the
+    next cursor taken from their id.
+    """
+    rows = query.all()
+    response = rows_response(rows)
+    set_next_cursor(response, rows, limit, lambda row: row.id)
+    return response
 
 @app.post("/api/tournaments")
-def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_db)):
+def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_write_db)):
     try:
         # Validate dates
         if tournament.start_date >= tournament.end_date:
@@ -360,7 +543,8 @@ def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_db
             min_referee_level=tournament.min_referee_level,
             status="upcoming",
             court_type=tournament.court_type,
-            spectator_count=0
+            spectator_count=0,
+            capacity=tournament.capacity if tournament.capacity is not None else settings.TOURNAMENT_CAPACITY
         )
         db.add(db_tournament)
         db.commit()
@@ -375,6 +559,8 @@ def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_db
         )
         db.add(initial_phase)
         db.commit()
+        reference_cache.invalidate("tournament", db_tournament.id)
+        reference_cache.invalidate("tournament_phases", db_tournament.id)
         
         return {
             "message": "Tournament created successfully",
@@ -386,12 +572,18 @@ def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_db
         raise HTTPException(status_code=500, detail=str(e))
 
 # Team management endpoints
-@app.get("/api/teams")
-def get_teams(db: Session = Depends(get_db)):
-    return db.query(Team).all()
+@app.get("/api/teams", dependencies=[Depends(conditional_get("teams"))])
+def get_teams(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last team id of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    query = db.query(*project(model_fields(Team), fields))
+    return _page(keyset(query, Team.id, limit, after), limit)
 
 @app.post("/api/teams/{team_id}/discipline")
-def discipline_team(team_id: int, db: Session = Depends(get_db)):
+def discipline_team(team_id: int, db: Session = Depends(get_write_db)):
     team = db.query(Team).filter(Team.id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
@@ -403,10 +595,12 @@ def discipline_team(team_id: int, db: Session = Depends(get_db)):
     db.add(team)
     db.commit()
     db.refresh(team)
+    invalidate_principal(team.user_id)
+    reference_cache.invalidate("team", team.id)
     return {"message": f"Disciplinary action recorded for team {team.name}. Current actions: {team.disciplinary_actions_count}. Blocked: {team.is_blocked}"}
 
 @app.post("/api/teams/{team_id}/unblock")
-def unblock_team(team_id: int, db: Session = Depends(get_db)):
+def unblock_team(team_id: int, db: Session = Depends(get_write_db)):
     team = db.query(Team).filter(Team.id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
@@ -417,10 +611,12 @@ def unblock_team(team_id: int, db: Session = Depends(get_db)):
     db.add(team)
     db.commit()
     db.refresh(team)
+    invalidate_principal(team.user_id)
+    reference_cache.invalidate("team", team.id)
     return {"message": f"Team {team.name} has been unblocked and disciplinary actions reset."}
 
 @app.post("/api/teams/{team_id}/block")
-def block_team(team_id: int, db: Session = Depends(get_db)):
+def block_team(team_id: int, db: Session = Depends(get_write_db)):
     team = db.query(Team).filter(Team.id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
@@ -428,117 +624,170 @@ def block_team(team_id: int, db: Session = Depends(get_db)):
     db.add(team)
     db.commit()
     db.refresh(team)
+    invalidate_principal(team.user_id)
+    reference_cache.invalidate("team", team.id)
     return {"message": f"Team {team.name} has been blocked."}
 
 # Get team players
 @app.get("/api/teams/{team_id}/players")
-def get_team_players(team_id: int, db: Session = Depends(get_db)):
-    return db.query(Player).filter(Player.team_id == team_id).all()
-
-@app.get("/api/tournaments/{tournament_id}/matches", response_model=TournamentMatchesResponse)
+def get_team_players(
+    team_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last player id of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    query = db.query(*project(model_fields(Player), fields)).filter(Player.team_id == team_id)
+    return _page(keyset(query, Player.id, limit, after), limit)
+
+# Serialized bracket per tournament, invalidated by every write to its matches
+# Pre-encoded bracket snapshots, in the reference cache backend: with the
+# sqlite backend a match update handled by any worker invalidates them for
+# all, and entries expire after REFERENCE_CACHE_TTL in any case
+match_snapshots = reference_cache.backend
+
+def _snapshot_key(tournament_id: int) -> str:
+    return f"match_snapshot:{tournament_id}"
+
+# The MatchResponse fields, in order, as labelled columns of matches joined with phases
+MATCH_COLUMNS = [
+    column.label(column.key) for column in (
+        Match.id, Match.tournament_id, Match.player1_id, Match.player2_id, Match.referee_id, Match.phase_id
+    )
+] + [Phase.name.label("phase_name")] + [
+    column.label(column.key) for column in (
+        Match.winner_id, Match.match_date, Match.court_number, Match.score, Match.status
+    )
+]
+
+def match_rows(db: Session, *criteria):
+    """Matches as MatchResponse-shaped rows, read as plain column tuples."""
+    return db.query(*MATCH_COLUMNS).join(Phase, Match.phase_id == Phase.id).filter(*criteria)
+
+@app.get("/api/tournaments/{tournament_id}/matches", response_model=TournamentMatchesResponse,
+         dependencies=[Depends(conditional_get("tournaments", "phases", "matches"))])
 def get_tournament_matches(tournament_id: int, db: Session = Depends(get_db)):
-    try:
-        # Get tournament
-        tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+    version, snapshot = match_snapshots.lookup(_snapshot_key(tournament_id))
+    if snapshot is None:
+        tournament = reference_cache.tournament(db, tournament_id)
         if not tournament:
-            print(f"Tournament {tournament_id} not found")
             raise HTTPException(status_code=404, detail="Tournament not found")
-        
-        print(f"Found tournament: {tournament.name}")
-        
-        # Get all matches for the tournament, joining with Phase to get phase name
-        matches_with_phases = db.query(Match, Phase.name.label("phase_name")) \
-                                .join(Phase, Match.phase_id == Phase.id) \
-                                .filter(Match.tournament_id == tournament_id) \
-                                .all()
-        
-        print(f"Raw matches with phase names from DB for tournament {tournament_id}: {matches_with_phases}")
-        print(f"Found {len(matches_with_phases)} matches for tournament {tournament_id}")
-        
-        # Group matches by phase name
-        matches_by_phase = {}
+
         # Get all possible phases for the tournament to ensure all columns are present
-        tournament_phases = db.query(Phase).filter(Phase.tournament_id == tournament_id).all()
-        for phase_obj in tournament_phases:
-            matches_by_phase[phase_obj.name] = [] # Initialize with empty lists
-
-        for match_obj, phase_name in matches_with_phases:
-            # Manually construct MatchResponse to include phase_name from the join
-            match_response = MatchResponse(
-                id=match_obj.id,
-                tournament_id=match_obj.tournament_id,
-                player1_id=match_obj.player1_id,
-                player2_id=match_obj.player2_id,
-                referee_id=match_obj.referee_id,
-                phase_id=match_obj.phase_id,
-                phase_name=phase_name, # Assign phase_name directly
-                winner_id=match_obj.winner_id,
-                match_date=match_obj.match_date,
-                court_number=match_obj.court_number,
-                score=match_obj.score,
-                status=match_obj.status
-            )
-            matches_by_phase[phase_name].append(match_response.dict())
-        
-        response = {
+        matches_by_phase = {
+            phase_name: []
+            for (phase_name,) in db.query(Phase.name).filter(Phase.tournament_id == tournament_id)
+        }
+
+        # Get all matches for the tournament, joining with Phase to get phase name
+        for row in match_rows(db, Match.tournament_id == tournament_id):
+            matches_by_phase[row.phase_name].append(row._asdict())
+
+        snapshot = orjson.dumps({
             "tournament_id": tournament.id,
             "tournament_name": tournament.name,
             "matches": matches_by_phase
-        }
-        print("Response:", response)
-        return response
-        
-    except Exception as e:
-        print(f"Error in get_tournament_matches: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        })
+        match_snapshots.store(_snapshot_key(tournament_id), version, snapshot)
+
+    return Response(content=snapshot, media_type="application/json")
+
+def matches_changed(db: Session, tournament_id: int, match_ids: List[int]):
+    """
+    Called after a commit that touched matches of the tournament: drops the
+    cached bracket snapshot and pushes the matches to the live feed subscribers.
+    """
+    match_snapshots.bump(_snapshot_key(tournament_id))
+    if not match_ids or not live_feed.has_subscribers(tournament_id):
+        return
+    live_feed.publish(tournament_id, "matches", [row._asdict() for row in match_rows(db, Match.id.in_(match_ids))])
+
+@app.get("/api/tournaments/{tournament_id}/live")
+async def stream_tournament_matches(tournament_id: int, request: Request):
+    """
+    Server-Sent Events stream of the matches of a tournament that change.
+    Clients load /matches once and then apply the pushed updates.
+    """
+    queue = live_feed.subscribe(tournament_id)
+
+    async def events():
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            live_feed.unsubscribe(tournament_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/tournaments/{tournament_id}/players")
-def get_tournament_players(tournament_id: int, db: Session = Depends(get_db)):
+def get_tournament_players(
+    tournament_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last player id of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
     # Get tournament
-    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
-    if not tournament:
+    if not reference_cache.tournament(db, tournament_id):
         raise HTTPException(status_code=404, detail="Tournament not found")
     
-    # Get all players registered for the tournament through TournamentRegistration
-    registered_players = db.query(Player).join(
+    # Players registered for the tournament, in the order of the (tournament_id, player_id) index
+    query = db.query(*project(model_fields(Player), fields)).join(
         TournamentRegistration, Player.id == TournamentRegistration.player_id
     ).filter(
         TournamentRegistration.tournament_id == tournament_id
-    ).all()
-    
-    return registered_players
+    )
+    return _page(keyset(query, TournamentRegistration.player_id, limit, after), limit)
 
 @app.delete("/api/tournaments/{tournament_id}/players/{player_id}")
-def remove_player_from_tournament(tournament_id: int, player_id: int, db: Session = Depends(get_db)):
+def remove_player_from_tournament(tournament_id: int, player_id: int, db: Session = Depends(get_write_db)):
     registration = db.query(TournamentRegistration).filter(
         TournamentRegistration.tournament_id == tournament_id,
         TournamentRegistration.player_id == player_id
     ).first()
     if not registration:
         raise HTTPException(status_code=404, detail="Player not registered for this tournament")
+    team_id = db.query(Player.team_id).filter(Player.id == player_id).scalar()
     db.delete(registration)
+    release_places(db, tournament_id, 1)
+    if team_id is not None:
+        leave_team_tournament(db, tournament_id, team_id)
     db.commit()
     return {"message": "Player removed from tournament"}
 
-@app.get("/api/referees")
-def get_referees(db: Session = Depends(get_db)):
-    referees = db.query(Referee).all()
-    return referees
+@app.get("/api/referees", dependencies=[Depends(conditional_get("referees"))])
+def get_referees(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last referee id of the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    query = db.query(*project(model_fields(Referee), fields))
+    return _page(keyset(query, Referee.id, limit, after), limit)
 
 @app.get("/api/referees/{referee_id}", response_model=RefereeResponse)
 def get_referee_profile(referee_id: int, db: Session = Depends(get_db)):
-    referee = db.query(Referee).filter(Referee.id == referee_id).first()
+    referee = reference_cache.referee(db, referee_id)
     if not referee:
         raise HTTPException(status_code=404, detail="Referee not found")
     return referee
 
 @app.delete("/api/referees/{referee_id}")
-def delete_referee(referee_id: int, db: Session = Depends(get_db)):
+def delete_referee(referee_id: int, db: Session = Depends(get_write_db)):
     referee = db.query(Referee).filter(Referee.id == referee_id).first()
     if not referee:
         raise HTTPException(status_code=404, detail="Referee not found")
     db.delete(referee)
     db.commit()
+    reference_cache.invalidate("referee", referee_id)
     return {"message": f"Referee {referee_id} deleted"}
 
 from pydantic import BaseModel
@@ -546,27 +795,27 @@ class RefereeScoreUpdate(BaseModel):
     score: int
 
 @app.put("/api/referees/{referee_id}/score")
-def update_referee_score(referee_id: int, score_update: RefereeScoreUpdate, db: Session = Depends(get_db)):
+def update_referee_score(referee_id: int, score_update: RefereeScoreUpdate, db: Session = Depends(get_write_db)):
     referee = db.query(Referee).filter(Referee.id == referee_id).first()
     if not referee:
         raise HTTPException(status_code=404, detail="Referee not found")
-    referee.score = score_update.score
-    db.add(referee)
+    # Recorded in the score ledger as an adjustment, like any other change of the total
+    adjust_score(db, "referee", referee_id, score_update.score - (referee.score or 0))
     db.commit()
     db.refresh(referee)
+    reference_cache.invalidate("referee", referee_id)
     return {"message": f"Referee {referee_id} score updated", "score": referee.score}
 
 @app.post("/api/tournaments/{tournament_id}/matches")
-def create_tournament_match(tournament_id: int, match: MatchCreate, db: Session = Depends(get_db)):
+def create_tournament_match(tournament_id: int, match: MatchCreate, db: Session = Depends(get_write_db)):
     try:
         # Get tournament
-        tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+        tournament = reference_cache.tournament(db, tournament_id)
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
         # Validate phase
-        phase = db.query(Phase).filter(Phase.id == match.phase_id).first()
-        if not phase or phase.tournament_id != tournament_id:
+        if match.phase_id not in {phase.id for phase in reference_cache.tournament_phases(db, tournament_id)}:
             raise HTTPException(status_code=404, detail="Invalid phase")
         
         # Validate players
@@ -576,7 +825,7 @@ def create_tournament_match(tournament_id: int, match: MatchCreate, db: Session
             raise HTTPException(status_code=404, detail="One or both players not found")
         
         # Validate referee
-        referee = db.query(Referee).filter(Referee.id == match.referee_id).first()
+        referee = reference_cache.referee(db, match.referee_id)
         if not referee:
             raise HTTPException(status_code=404, detail="Referee not found")
         
@@ -595,11 +844,13 @@ def create_tournament_match(tournament_id: int, match: MatchCreate, db: Session
             court_number=match.court_number,
             status=match.status,
             score=match.score,
-            winner_id=match.winner_id
+            winner_id=match.winner_id,
+            bracket_slot=match.bracket_slot
         )
         db.add(db_match)
         db.commit()
         db.refresh(db_match)
+        matches_changed(db, tournament_id, [db_match.id])
         
         return {
             "message": "Match created successfully",
@@ -609,8 +860,153 @@ def create_tournament_match(tournament_id: int, match: MatchCreate, db: Session
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/tournaments/{tournament_id}/matches:bulk")
+def create_tournament_matches_bulk(tournament_id: int, payload: BulkMatchCreate, db: Session = Depends(get_write_db)):
+    """
+    Create many matches at once. Phases, players and referees are loaded once
+    for the whole batch; valid matches are inserted together and invalid ones
+    are reported by their index in the request.
+    """
+    tournament = reference_cache.tournament(db, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+
+    matches = payload.matches
+    phase_ids = {phase.id for phase in reference_cache.tournament_phases(db, tournament_id)}
+    requested_players = {m.player1_id for m in matches} | {m.player2_id for m in matches}
+    player_ids = {player_id for (player_id,) in db.query(Player.id).filter(Player.id.in_(requested_players))}
+    referee_levels = dict(db.query(Referee.id, Referee.level).filter(
+        Referee.id.in_({m.referee_id for m in matches})
+    ))
+
+    rows = []
+    indexes = []
+    errors = []
+    for index, match in enumerate(matches):
+        if match.phase_id not in phase_ids:
+            errors.append({"index": index, "detail": "Invalid phase"})
+        elif match.player1_id not in player_ids or match.player2_id not in player_ids:
+            errors.append({"index": index, "detail": "One or both players not found"})
+        elif match.referee_id not in referee_levels:
+            errors.append({"index": index, "detail": "Referee not found"})
+        elif referee_levels[match.referee_id] < tournament.min_referee_level:
+            errors.append({"index": index, "detail": "Referee level too low for this tournament"})
+        else:
+            rows.append({"tournament_id": tournament_id, **match.dict()})
+            indexes.append(index)
+
+    created = []
+    if rows:
+        try:
+            match_ids = db.scalars(insert(Match).returning(Match.id, sort_by_parameter_order=True), rows).all()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        created = [{"index": index, "match_id": match_id} for index, match_id in zip(indexes, match_ids)]
+        matches_changed(db, tournament_id, match_ids)
+
+    return {
+        "message": f"{len(created)} matches created, {len(errors)} rejected",
+        "created": created,
+        "errors": errors
+    }
+
+@app.post("/api/tournaments/{tournament_id}/draw")
+def generate_tournament_draw(tournament_id: int, draw: DrawCreate, db: Session = Depends(get_write_db)):
+    """
+    Seed the registered players by score and create every phase of the bracket
+    plus the first-round matches in a single transaction.
+    """
+    tournament = reference_cache.tournament(db, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+
+    if db.query(Match.id).filter(Match.tournament_id == tournament_id).first():
+        raise HTTPException(status_code=400, detail="The tournament already has matches")
+
+    # Registered players, best score first
+    seeded_ids = [player_id for (player_id,) in db.query(Player.id).join(
+        TournamentRegistration, Player.id == TournamentRegistration.player_id
+    ).filter(
+        TournamentRegistration.tournament_id == tournament_id
+    ).order_by(Player.score.desc(), Player.id)]
+
+    draw_size = len(seeded_ids)
+    if draw_size not in ROUND_NAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A draw needs {', '.join(map(str, sorted(ROUND_NAMES)))} registered players, found {draw_size}"
+        )
+
+    # Validate referees in one query
+    referee_query = db.query(Referee.id).filter(Referee.level >= tournament.min_referee_level)
+    if draw.referee_ids is not None:
+        referee_query = referee_query.filter(Referee.id.in_(draw.referee_ids))
+    referee_ids = [referee_id for (referee_id,) in referee_query.order_by(Referee.id)]
+    if draw.referee_ids is not None and len(referee_ids) != len(set(draw.referee_ids)):
+        invalid = sorted(set(draw.referee_ids) - set(referee_ids))
+        raise HTTPException(status_code=400, detail=f"Referees not found or level too low: {invalid}")
+    if not referee_ids:
+        raise HTTPException(status_code=400, detail="No referee with the required level")
+
+    try:
+        # Reuse phases that already exist, create the missing ones in bulk. The
+        # tournament has no matches yet, so the others (the "First Round"
+        # placeholder of create_tournament) are empty and leave the bracket
+        phases = {phase.name: phase.id for phase in reference_cache.tournament_phases(db, tournament_id)}
+        rounds = rounds_for(draw_size)
+        unused = [phases.pop(name) for name in list(phases) if name not in rounds]
+        if unused:
+            db.execute(delete(Phase).where(Phase.id.in_(unused)))
+        missing = [
+            {
+                "tournament_id": tournament_id,
+                "name": name,
+                "start_date": tournament.start_date + timedelta(days=2 * i),
+                "end_date": tournament.start_date + timedelta(days=2 * i + 1)
+            }
+            for i, name in enumerate(rounds) if name not in phases
+        ]
+        if missing:
+            created = db.execute(insert(Phase).returning(Phase.id, Phase.name), missing)
+            phases.update({name: phase_id for phase_id, name in created})
+
+        first_round = db.query(Phase).filter(Phase.id == phases[ROUND_NAMES[draw_size]]).first()
+        order = seeding_order(draw_size)
+        matches = []
+        for slot in range(draw_size // 2):
+            matches.append({
+                "tournament_id": tournament_id,
+                "player1_id": seeded_ids[order[2 * slot] - 1],
+                "player2_id": seeded_ids[order[2 * slot + 1] - 1],
+                "referee_id": referee_ids[slot % len(referee_ids)],
+                "phase_id": first_round.id,
+                "match_date": first_round.start_date + timedelta(
+                    hours=(slot // draw.courts) * draw.match_interval_hours
+                ),
+                "court_number": slot % draw.courts + 1,
+                "status": "scheduled",
+                "bracket_slot": slot
+            })
+        match_ids = db.scalars(insert(Match).returning(Match.id), matches).all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if missing or unused:
+        reference_cache.invalidate("tournament_phases", tournament_id)
+    matches_changed(db, tournament_id, match_ids)
+    return {
+        "message": "Draw generated successfully",
+        "draw_size": draw_size,
+        "phases": {name: phases[name] for name in rounds},
+        "matches_created": len(matches)
+    }
+
 @app.put("/api/matches/{match_id}")
-def update_match(match_id: int, match_update: MatchUpdate, db: Session = Depends(get_db)):
+def update_match(match_id: int, match_update: MatchUpdate, db: Session = Depends(get_write_db)):
     try:
         # Get match
         match = db.query(Match).filter(Match.id == match_id).first()
@@ -624,14 +1020,25 @@ def update_match(match_id: int, match_update: MatchUpdate, db: Session = Depends
             match.winner_id = match_update.winner_id
         if match_update.status is not None:
             match.status = match_update.status
+
+        # Move the winner into the next phase in the same transaction
+        next_match = None
+        if match.status == "completed" and match.winner_id:
+            next_match = advance_winner(db, match)
         
         db.commit()
         db.refresh(match)
+        matches_changed(
+            db, match.tournament_id, [match.id] + ([next_match.id] if next_match is not None else [])
+        )
         
-        return {
+        response = {
             "message": "Match updated successfully",
             "match_id": match.id
         }
+        if next_match is not None:
+            response["next_match_id"] = next_match.id
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -642,200 +1049,200 @@ def get_tournament_phases(tournament_id: int, db: Session = Depends(get_db)):
     return phases
 
 @app.post("/api/tournaments/{tournament_id}/register-team")
-def register_team_for_tournament(tournament_id: int, registration: TeamTournamentRegistration, db: Session = Depends(get_db)):
-    # Get tournament
-    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+def register_team_for_tournament(tournament_id: int, registration: TeamTournamentRegistration, db: Session = Depends(get_write_db)):
+    # Fast path: places and rows are taken in one transaction, the checks are
+    # part of the INSERT ... SELECT and only run separately to explain a failure
+    if register_players(db, tournament_id, registration.team_id, registration.player_ids):
+        db.commit()
+        return {"message": "Players registered successfully for the tournament"}
+    db.rollback()
+    raise _registration_error(db, tournament_id, registration)
+
+def _registration_error(db: Session, tournament_id: int, registration: TeamTournamentRegistration) -> HTTPException:
+    tournament = reference_cache.tournament(db, tournament_id)
     if not tournament:
-        raise HTTPException(status_code=404, detail="Tournament not found")
-    
-    # Check if team is blocked
-    team = db.query(Team).filter(Team.id == registration.team_id).first()
+        return HTTPException(status_code=404, detail="Tournament not found")
+
+    team = reference_cache.team(db, registration.team_id)
     if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
+        return HTTPException(status_code=404, detail="Team not found")
     if team.is_blocked:
-        raise HTTPException(status_code=403, detail="Il team è bloccato e non può iscriversi a nuovi tornei.")
-    
-    # Verify all players belong to the team
-    team_players = db.query(Player).filter(
+        return HTTPException(status_code=403, detail="Il team è bloccato e non può iscriversi a nuovi tornei.")
+
+    requested = set(registration.player_ids)
+    team_players = db.query(Player.id).filter(
         Player.team_id == registration.team_id,
-        Player.id.in_(registration.player_ids)
-    ).all()
-    
-    if len(team_players) != len(registration.player_ids):
-        raise HTTPException(status_code=400, detail="Some players do not belong to the team")
-    
-    # Check if any player is already registered
-    existing_registrations = db.query(TournamentRegistration).filter(
+        Player.id.in_(requested)
+    ).count()
+    if team_players != len(requested):
+        return HTTPException(status_code=400, detail="Some players do not belong to the team")
+
+    already_registered = db.query(TournamentRegistration.id).filter(
         TournamentRegistration.tournament_id == tournament_id,
-        TournamentRegistration.player_id.in_(registration.player_ids)
-    ).all()
-    
-    if existing_registrations:
-        raise HTTPException(status_code=400, detail="Some players are already registered for this tournament")
-    
-    # Create registrations for each player
-    for player in team_players:
-        db_registration = TournamentRegistration(
-            tournament_id=tournament_id,
-            player_id=player.id
-        )
-        db.add(db_registration)
-    
-    db.commit()
-    return {"message": "Players registered successfully for the tournament"}
+        TournamentRegistration.player_id.in_(requested)
+    ).first()
+    if already_registered:
+        return HTTPException(status_code=400, detail="Some players are already registered for this tournament")
+
+    return HTTPException(status_code=400, detail="Not enough free places left in this tournament")
 
 # New endpoint to get tournaments for a specific team, optionally filtered by status
 @app.get("/api/teams/{team_id}/tournaments")
 def get_team_tournaments(
     team_id: int,
     db: Session = Depends(get_db),
-    status: Optional[str] = None # Filter by status (e.g., 'upcoming', 'completed')
+    status: Optional[str] = None, # Filter by status (e.g., 'upcoming', 'completed')
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last tournament id of the previous page")
 ):
-    # Get all players belonging to the team
-    team_players = db.query(Player).filter(Player.team_id == team_id).all()
-    if not team_players:
-        return [] # No players in team, so no tournaments they can register for
-
-    # Get tournament IDs that any player from this team is registered for
-    registered_tournament_ids = db.query(TournamentRegistration.tournament_id).filter(
-        TournamentRegistration.player_id.in_([p.id for p in team_players])
-    ).distinct().all()
+    return _page(_team_tournaments(db, team_id, status, limit, after), limit)
 
-    # Extract just the IDs from the result
-    tournament_ids = [t_id for (t_id,) in registered_tournament_ids]
-
-    # Fetch tournaments based on these IDs
-    query = db.query(Tournament).filter(Tournament.id.in_(tournament_ids))
-    
+def _team_tournaments(db: Session, team_id: int, status: Optional[str], limit: Optional[int], after: Optional[int]):
+    # One query: the (team_id, tournament_id) key of team_tournaments, then tournaments by id
+    query = db.query(*project(model_fields(Tournament), None)) \
+              .join(TeamTournament, TeamTournament.tournament_id == Tournament.id) \
+              .filter(TeamTournament.team_id == team_id)
     if status:
         query = query.filter(Tournament.status == status)
-        
-    tournaments = query.all()
-    return tournaments 
+    return keyset(query, TeamTournament.tournament_id, limit, after)
 
 @app.get("/api/tournaments/history", response_model=List[TournamentResponse])
-def get_tournament_history(team_id: Optional[int] = None, db: Session = Depends(get_db)):
-    # Get all completed tournaments
-    query = db.query(Tournament).filter(Tournament.status == 'completed')
-    
+def get_tournament_history(
+    team_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Last tournament id of the previous page"),
+    db: Session = Depends(get_db)
+):
+    # Completed tournaments, optionally only those where the team participated
     if team_id:
-        # If team_id is provided, get tournaments where the team participated
-        team_tournaments = db.query(Tournament).join(
-            TournamentRegistration, Tournament.id == TournamentRegistration.tournament_id
-        ).join(
-            Player, TournamentRegistration.player_id == Player.id
-        ).filter(
-            Player.team_id == team_id
-        ).distinct().all()
-        
-        return team_tournaments
+        query = _team_tournaments(db, team_id, "completed", limit, after)
+    else:
+        query = db.query(*project(model_fields(Tournament), None)).filter(Tournament.status == 'completed')
+        query = keyset(query, Tournament.id, limit, after)
+    return _page(query, limit)
+
+def _unfinished_match(db: Session, tournament_id: int):
+    return db.query(Match.id).filter(
+        Match.tournament_id == tournament_id,
+        Match.status.is_distinct_from("completed")
+    ).first()
+
+@app.put("/api/tournaments/{tournament_id}/complete", status_code=202)
+def complete_tournament(tournament_id: int, response: Response, db: Session = Depends(get_write_db)):
+    """
+    Queue the completion of a tournament: the status change and the score
+    credits run as a background job, whose state is at GET /api/jobs/{job_id}.
+    """
+    tournament = reference_cache.tournament(db, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
     
-    return query.all() 
-
-# Scoring system constants
-TOURNAMENT_SCORES = {
-    "FINAL": {
-        "winner": 100,
-        "runner_up": 60
-    },
-    "SEMIFINAL": {
-        "winner": 50,
-        "loser": 30
-    },
-    "QUARTERFINAL": {
-        "winner": 25,
-        "loser": 15
-    },
-    "ROUND_OF_16": {
-        "winner": 10,
-        "loser": 5
+    # Checked here to fail fast, and again by the job inside its transaction
+    if _unfinished_match(db, tournament_id):
+        raise HTTPException(status_code=400, detail="Not all matches are completed")
+    
+    job = job_runner.submit(
+        db, "complete_tournament", f"complete_tournament:{tournament_id}", {"tournament_id": tournament_id}
+    )
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return {
+        "message": f"Completion of tournament {tournament.name} ({tournament.edition}) queued.",
+        "job_id": job.id,
+        "status": job.status
     }
-}
-
-REFEREE_SCORING = {
-    "FINAL": 10,
-    "SEMIFINAL": 7,
-    "QUARTERFINAL": 5,
-    "ROUND_OF_16": 3,
-}
-
-def update_player_scores(tournament_id: int, db: Session):
-    """Update player scores based on their performance in the tournament."""
-    # Get all matches for the tournament
-    matches = db.query(Match).join(Phase).filter(
-        Match.tournament_id == tournament_id,
-        Match.status == "completed"
-    ).order_by(Phase.name).all()
-
-    # Group matches by phase
-    matches_by_phase = {}
-    for match in matches:
-        phase = db.query(Phase).filter(Phase.id == match.phase_id).first()
-        if phase.name not in matches_by_phase:
-            matches_by_phase[phase.name] = []
-        matches_by_phase[phase.name].append(match)
-
-    # Update scores for each phase
-    for phase_name, phase_matches in matches_by_phase.items():
-        if phase_name in TOURNAMENT_SCORES:
-            for match in phase_matches:
-                # Update winner's score
-                if match.winner_id:
-                    winner = db.query(Player).filter(Player.id == match.winner_id).first()
-                    if winner:
-                        winner.score += TOURNAMENT_SCORES[phase_name]["winner"]
-                
-                # Update loser's score
-                loser_id = match.player2_id if match.winner_id == match.player1_id else match.player1_id
-                loser = db.query(Player).filter(Player.id == loser_id).first()
-                if loser:
-                    loser.score += TOURNAMENT_SCORES[phase_name]["loser"]
 
-    db.commit()
+def _score_changes_committed(tournament_id: int, referee_deltas: dict):
+    reference_cache.invalidate("tournament", tournament_id)
+    for referee_id in referee_deltas:
+        reference_cache.invalidate("referee", referee_id)
+
+def complete_tournament_job(db: Session, payload: dict) -> dict:
+    """
+    Mark the tournament completed and credit player and referee scores in one
+    transaction. The status only changes if it was not completed yet, and the
+    scores only when it changes, so a retried job never credits twice.
+    """
+    tournament_id = payload["tournament_id"]
+    if _unfinished_match(db, tournament_id):
+        raise ValueError("Not all matches are completed")
+
+    completed = db.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id, Tournament.status.is_distinct_from("completed"))
+        .values(status="completed")
+    ).rowcount
+    if not completed:
+        return {"message": "Tournament already completed, no scores credited", "players": 0, "referees": 0}
+
+    player_deltas, referee_deltas = apply_tournament_scores(tournament_id, db)
+
+    @event.listens_for(db, "after_commit", once=True)
+    def invalidate_references(session):
+        _score_changes_committed(tournament_id, referee_deltas)
+
+    return {
+        "message": "Tournament marked as completed and scores updated",
+        "players": len(player_deltas),
+        "referees": len(referee_deltas)
+    }
+
+job_runner.register("complete_tournament", complete_tournament_job)
 
-def update_referee_scores(tournament_id: int, db: Session):
-    matches = db.query(Match).filter(Match.tournament_id == tournament_id, Match.status == "completed").all()
-    referee_scores_update = {}
-
-    for match in matches:
-        # Ensure match.phase_id is not None before proceeding
-        if match.phase_id:
-            phase = db.query(Phase).filter(Phase.id == match.phase_id).first()
-            if phase and phase.name in REFEREE_SCORING:
-                referee_id = match.referee_id
-                score_to_add = REFEREE_SCORING[phase.name]
-                referee_scores_update[referee_id] = referee_scores_update.get(referee_id, 0) + score_to_add
-
-    for referee_id, score_change in referee_scores_update.items():
-        referee = db.query(Referee).filter(Referee.id == referee_id).first()
-        if referee:
-            referee.score += score_change
-            db.add(referee)
+@app.put("/api/tournaments/{tournament_id}/rescore")
+def rescore_completed_tournament(tournament_id: int, db: Session = Depends(get_write_db)):
+    """
+    Recompute the points of a completed tournament from its current match
+    results, e.g. after a result has been corrected. Only the ledger entries
+    of this tournament are replaced.
+    """
+    tournament = reference_cache.tournament(db, tournament_id)
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    # Read in the write transaction: a reopen may have just committed
+    if db.scalar(select(Tournament.status).where(Tournament.id == tournament_id)) != "completed":
+        raise HTTPException(status_code=400, detail="Tournament is not completed")
 
+    player_deltas, referee_deltas = rescore_tournament(tournament_id, db)
     db.commit()
-    print(f"[DEBUG] Referee scores updated for tournament {tournament_id}.")
+    _score_changes_committed(tournament_id, referee_deltas)
+    return {
+        "message": f"Scores of tournament {tournament.name} ({tournament.edition}) recomputed",
+        "players": len(player_deltas),
+        "referees": len(referee_deltas)
+    }
 
-@app.put("/api/tournaments/{tournament_id}/complete")
-def complete_tournament(tournament_id: int, db: Session = Depends(get_db)):
-    """Mark a tournament as completed and update player scores."""
-    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+@app.put("/api/tournaments/{tournament_id}/reopen")
+def reopen_tournament(tournament_id: int, db: Session = Depends(get_write_db)):
+    """
+    Take back the points credited by a completed tournament and set it back to
+    active, so that it can be completed again.
+    """
+    tournament = reference_cache.tournament(db, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
-    
-    # Check if all matches are completed
-    matches = db.query(Match).filter(Match.tournament_id == tournament_id).all()
-    if not all(match.status == "completed" for match in matches):
-        raise HTTPException(status_code=400, detail="Not all matches are completed")
-    
-    # Update tournament status
-    tournament.status = "completed"
-    
-    # Update player scores
-    update_player_scores(tournament_id, db)
-    update_referee_scores(tournament_id, db)
-    
+
+    reopened = db.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id, Tournament.status == "completed")
+        .values(status="active")
+    ).rowcount
+    if not reopened:
+        raise HTTPException(status_code=400, detail="Tournament is not completed")
+    player_deltas, referee_deltas = revert_tournament_scores(tournament_id, db)
     db.commit()
-    return {"message": f"Tournament {tournament.name} ({tournament.edition}) marked as completed and scores updated."}
+    _score_changes_committed(tournament_id, referee_deltas)
+    return {
+        "message": f"Tournament {tournament.name} ({tournament.edition}) reopened and its scores reverted",
+        "players": len(player_deltas),
+        "referees": len(referee_deltas)
+    }
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @app.get("/api/tournaments/most-spectators", response_model=TournamentCreate)
 def get_tournament_with_most_spectators(db: Session = Depends(get_db)):
@@ -847,10 +1254,12 @@ def get_tournament_with_most_spectators(db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="No tournaments found with spectator data")
     return tournament
 
-@app.get("/api/referees/rankings", response_model=List[RefereeResponse])
+@app.get("/api/referees/rankings", response_model=List[RefereeResponse],
+         dependencies=[Depends(conditional_get("referees"))])
 def get_referee_rankings(db: Session = Depends(get_db)):
     """
     Retrieve a list of all referees sorted by their scores in descending order.
     """
-    referees = db.query(Referee).order_by(Referee.score.desc()).all()
-    return referees 
\ No newline at end of file
+    referees = db.query(*project(model_fields(Referee), None)).order_by(Referee.score.desc()).all()
+    return rows_response(referees)
+ 
\ No newline at end of file
@@ -0,0 +1,106 @@
+from sqlalchemy import inspect, text
+from .config import settings
+from .models import Base
+from .registrations import recount_registrations, rebuild_team_tournaments
+from .scoring import rebuild_score_events
+from .versions import resource_versions
+
+# Columns added after the first release; create_all does not add them to
+# tables that already exist
+ADDED_COLUMNS = {
+    "matches": {
+        "bracket_slot": "INTEGER",
+    },
+    "tournaments": {
+        "registered_count": "INTEGER NOT NULL DEFAULT 0",
+        "capacity": f"INTEGER NOT NULL DEFAULT {settings.TOURNAMENT_CAPACITY}",
+    },
+    "jobs": {
+        "owner": "VARCHAR",
+        "lease_expires_at": "DATETIME",
+    },
+}
+
+def _fill_capacity(conn):
+    # Tournaments that already hold more players keep them
+    conn.execute(text("UPDATE tournaments SET capacity = registered_count WHERE registered_count > capacity"))
+
+# Run once, right after the column has been added
+BACKFILLS = {
+    ("tournaments", "registered_count"): recount_registrations,
+    ("tournaments", "capacity"): _fill_capacity,
+}
+
+# Indexes superseded by a later declaration
+DROPPED_INDEXES = ["ix_registrations_tournament_player"]
+
+def _remove_duplicate_registrations(conn):
+    # Keep the first registration of each player; counts are rebuilt afterwards
+    conn.execute(text(
+        "DELETE FROM tournament_registrations WHERE id NOT IN "
+        "(SELECT min(id) FROM tournament_registrations GROUP BY tournament_id, player_id)"
+    ))
+    recount_registrations(conn)
+
+# Run before a unique index is created on a table that already has rows
+BEFORE_INDEX = {
+    "uq_registrations_tournament_player": _remove_duplicate_registrations,
+}
+
+# Derived tables filled from existing rows when they are first created
+CREATED_TABLES = {
+    "team_tournaments": rebuild_team_tournaments,
+    "score_events": rebuild_score_events,
+}
+
+def _index_names(conn, inspector, table: str) -> set:
+    if conn.dialect.name == "sqlite":
+        # The inspector skips expression indexes such as ix_tournaments_free_places
+        return {row[1] for row in conn.execute(text(f"PRAGMA index_list({table})"))}
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+def upgrade_schema(engine):
+    """Bring an existing database up to the current models."""
+    tables_before = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    # Rows rewritten below bypass the session events that bump table versions
+    rewritten = False
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                    rewritten = True
+                    if (table, name) in BACKFILLS:
+                        BACKFILLS[(table, name)](conn)
+
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        # Indexes declared on tables that predate them
+        created = False
+        for table in Base.metadata.sorted_tables:
+            existing = _index_names(conn, inspector, table.name)
+            for index in table.indexes:
+                if index.name not in existing:
+                    if index.name in BEFORE_INDEX:
+                        BEFORE_INDEX[index.name](conn)
+                        rewritten = True
+                    index.create(conn)
+                    created = True
+
+        # After the registrations have been deduplicated
+        if tables_before:
+            for table, fill in CREATED_TABLES.items():
+                if table not in tables_before:
+                    fill(conn)
+                    rewritten = True
+
+        # Give the SQLite planner statistics to choose between the new indexes
+        if created and engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+    if rewritten:
+        resource_versions.rotate()
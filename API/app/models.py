@@ -1,12 +1,82 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime, Enum
+from sqlalchemy import create_engine, event, Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import enum
 from .config import settings
 
 # Database setup
-engine = create_engine(settings.DATABASE_URL)
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url.split("?")[0] in ("sqlite://", "sqlite:///:memory:")
+
+def sqlite_pragmas(config=settings):
+    return [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}",
+        f"PRAGMA temp_store={config.SQLITE_TEMP_STORE}",
+    ]
+
+def _apply_sqlite_tuning(engine, config=settings):
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def create_db_engine(url: str = settings.DATABASE_URL, writer: bool = False, config=settings):
+    """
+    Build a sync engine with the configured SQLite profile.
+    writer=True returns a single-connection engine whose transactions start with
+    BEGIN IMMEDIATE, so writes queue in the pool instead of failing with
+    "database is locked" halfway through a transaction.
+    """
+    options = {}
+    if not (_is_sqlite(url) and _is_sqlite_memory(url)):
+        options["pool_size"] = 1 if writer else config.DB_POOL_SIZE
+        options["max_overflow"] = 0 if writer else config.DB_MAX_OVERFLOW
+        if writer:
+            options["pool_timeout"] = config.DB_WRITE_TIMEOUT
+    db_engine = create_engine(url, **options)
+
+    if _is_sqlite(url):
+        if config.SQLITE_TUNING:
+            _apply_sqlite_tuning(db_engine, config)
+        if writer:
+            @event.listens_for(db_engine, "connect")
+            def disable_driver_transactions(dbapi_connection, connection_record):
+                # Let the begin event below emit BEGIN instead of pysqlite
+                dbapi_connection.isolation_level = None
+
+            @event.listens_for(db_engine, "begin")
+            def begin_immediate(conn):
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+    return db_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Serialized writer path used by the endpoints that modify data
+write_engine = create_db_engine(writer=True)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+def create_async_db_engine(url: str = settings.async_database_url, config=settings):
+    db_engine = create_async_engine(url)
+    if _is_sqlite(url) and config.SQLITE_TUNING:
+        _apply_sqlite_tuning(db_engine.sync_engine, config)
+    return db_engine
+
+# Async engine for the handlers that run on the event loop
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Models
@@ -36,7 +106,24 @@ class Player(Base):
     name = Column(String)
     level = Column(Integer)
     score = Column(Integer, default=0)
-    team_id = Column(Integer, ForeignKey("teams.id"))
+    team_id = Column(Integer, ForeignKey("teams.id"), index=True)
+
+    __table_args__ = (
+        # Ranking order: rebuilds and draw seeding read the table in this order
+        Index("ix_players_ranking", score.desc(), id),
+    )
+
+class PlayerRank(Base):
+    # Materialized ranking, kept in sync by app.rankings
+    __tablename__ = "player_rankings"
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    position = Column(Integer, index=True)
+    score = Column(Integer)
+
+    __table_args__ = (
+        # Ranking order: finds the place of a new score with two index seeks
+        Index("ix_player_rankings_order", score.desc(), player_id),
+    )
 
 class Referee(Base):
     __tablename__ = "referees"
@@ -44,7 +131,7 @@ class Referee(Base):
     name = Column(String)
     last_name = Column(String)
     level = Column(Integer)
-    score = Column(Integer, default=0)
+    score = Column(Integer, default=0, index=True)
     fiscal_code = Column(String, unique=True, index=True)
 
 class Tournament(Base):
@@ -56,9 +143,18 @@ class Tournament(Base):
     end_date = Column(DateTime)
     min_level = Column(Integer)
     min_referee_level = Column(Integer)
-    status = Column(String)  # upcoming, active, completed
+    status = Column(String, index=True)  # upcoming, active, completed
     court_type = Column(String)
-    spectator_count = Column(Integer, default=0)
+    spectator_count = Column(Integer, default=0, index=True)
+    # Maintained by app.registrations together with the registration rows
+    registered_count = Column(Integer, default=0, nullable=False)
+    capacity = Column(Integer, default=settings.TOURNAMENT_CAPACITY, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tournaments_court_type_status", court_type, status),
+        # Serves the "tournaments with free places" filter
+        Index("ix_tournaments_free_places", capacity - registered_count),
+    )
 
 class TournamentRegistration(Base):
     __tablename__ = "tournament_registrations"
@@ -67,6 +163,23 @@ class TournamentRegistration(Base):
     player_id = Column(Integer, ForeignKey("players.id"))
     registration_date = Column(DateTime, default=None)
 
+    __table_args__ = (
+        # One per direction: players of a tournament, tournaments of a player.
+        # A player registers once per tournament.
+        Index("uq_registrations_tournament_player", tournament_id, player_id, unique=True),
+        Index("ix_registrations_player_tournament", player_id, tournament_id),
+    )
+
+class TeamTournament(Base):
+    # Tournaments in which a team has registered players, kept in sync by app.registrations
+    __tablename__ = "team_tournaments"
+    team_id = Column(Integer, ForeignKey("teams.id"), primary_key=True)
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    players = Column(Integer, nullable=False, default=0)
+
+    # Rows are stored in (team_id, tournament_id) order
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
 class RefereeAvailability(Base):
     __tablename__ = "referee_availability"
     id = Column(Integer, primary_key=True, index=True)
@@ -91,19 +204,76 @@ class Phase(Base):
     start_date = Column(DateTime)
     end_date = Column(DateTime)
 
+    __table_args__ = (
+        Index("ix_phases_tournament_name", tournament_id, name),
+    )
+
 class Match(Base):
     __tablename__ = "matches"
     id = Column(Integer, primary_key=True, index=True)
     tournament_id = Column(Integer, ForeignKey("tournaments.id"))
     player1_id = Column(Integer, ForeignKey("players.id"))
     player2_id = Column(Integer, ForeignKey("players.id"))
-    referee_id = Column(Integer, ForeignKey("referees.id"))
+    referee_id = Column(Integer, ForeignKey("referees.id"), index=True)
     phase_id = Column(Integer, ForeignKey("phases.id"))
     winner_id = Column(Integer, ForeignKey("players.id"), nullable=True)
     match_date = Column(DateTime)
     court_number = Column(Integer)
     score = Column(String, nullable=True)
     status = Column(String)  # scheduled, in_progress, completed
+    # Position of the match inside its phase: the winner of slot n plays
+    # slot n // 2 of the next phase
+    bracket_slot = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_matches_bracket", "phase_id", "bracket_slot"),
+        Index("ix_matches_tournament_status", "tournament_id", "status"),
+    )
+
+class ScoreEvent(Base):
+    # Append-only ledger of the points credited to players and referees;
+    # players.score and referees.score are its running totals (app.scoring)
+    __tablename__ = "score_events"
+    id = Column(Integer, primary_key=True, index=True)
+    # Both null for manual adjustments and opening balances
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), nullable=True)
+    match_id = Column(Integer, ForeignKey("matches.id"), nullable=True)
+    subject_type = Column(String, nullable=False)  # player, referee
+    subject_id = Column(Integer, nullable=False)
+    points = Column(Integer, nullable=False)
+    # End of the tournament, or time of the adjustment; null for opening balances
+    awarded_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # One credit per match and subject; also serves the per-tournament revert
+        Index("uq_score_events_source", tournament_id, match_id, subject_type, subject_id, unique=True),
+        # Covers the rolling-window sums
+        Index("ix_score_events_window", subject_type, awarded_at, subject_id, points),
+    )
+
+class Job(Base):
+    # Background work run by app.jobs; the row survives restarts
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # Identifies the work, e.g. complete_tournament:42
+    key = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    payload = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # The runner that claimed the job, and until when the claim holds
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # At most one queued or running job per key; finished ones are kept as history
+        Index("uq_jobs_active_key", key, unique=True, sqlite_where=status.in_(("queued", "running"))),
+    )
 
 # Dependency
 
@@ -112,4 +282,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_write_db():
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import HTTPException, Response
+
+# Upper bound for the `limit` query parameter of list endpoints
+MAX_PAGE_SIZE = 1000
+
+def keyset(query, key, limit: Optional[int], after):
+    """
+    Keyset pagination on a unique, indexed column: rows after the cursor value
+    `after`, in `key` order. Unlike OFFSET, the cost of a page does not grow
+    with its position. Without `limit` every remaining row is returned.
+    """
+    if after is not None:
+        query = query.filter(key > after)
+    query = query.order_by(key)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def set_next_cursor(response: Response, rows: list, limit: Optional[int], cursor_of):
+    """Expose the cursor of the next page in X-Next-After when the page is full."""
+    if limit is not None and len(rows) == limit:
+        response.headers["X-Next-After"] = str(cursor_of(rows[-1]))
+
+FIELDS_DESCRIPTION = "Comma separated names of the fields to return (default: all)"
+
+def model_fields(model) -> dict:
+    """Name -> column attribute for every column of a model."""
+    return {column.key: getattr(model, column.key) for column in model.__table__.columns}
+
+def project(available: dict, fields: Optional[str], always=("id",)) -> list:
+    """
+    Labelled columns for a `fields=` projection, so that only the requested
+    columns are read and no ORM objects are built. Names in `always` are
+    selected even when not requested, since pagination needs them.
+    """
+    if not fields:
+        names = list(available)
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        names = [name for name in always if name not in names] + names
+    return [available[name].label(name) for name in names]
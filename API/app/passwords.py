@@ -0,0 +1,97 @@
+import asyncio
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import bcrypt
+from .config import settings
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already waiting for a worker."""
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(("$2a$", "$2b$", "$2y$"))
+
+def hash_password_sync(password: str, rounds: int = settings.BCRYPT_ROUNDS) -> str:
+    """Blocking hash, for scripts such as the seed. Handlers use `password_hasher`."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+def _verify(password: str, stored: str) -> bool:
+    return bcrypt.checkpw(password.encode(), stored.encode())
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so the event loop never spends the
+    100-250 ms of CPU a hash costs. bcrypt releases the GIL, so the pool scales
+    across cores. Calls beyond `max_pending` are rejected instead of queueing
+    without bound.
+    """
+
+    def __init__(self, workers: Optional[int], max_pending: int, rounds: int):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.workers = self._executor._max_workers
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    async def _run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def _timed(self, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.busy_seconds += elapsed
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password_sync, password, self.rounds)
+
+    async def verify(self, password: str, stored: str) -> Tuple[bool, bool]:
+        """
+        Check a password against the stored value.
+        Returns (valid, needs_rehash); plaintext values from older databases
+        are accepted once and flagged so the caller can store a hash.
+        """
+        if not is_hashed(stored):
+            return hmac.compare_digest(password.encode(), stored.encode()), True
+        valid = await self._run(_verify, password, stored)
+        # Hashes made with a different cost factor are upgraded on login
+        needs_rehash = valid and int(stored.split("$")[2]) != self.rounds
+        return valid, needs_rehash
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.workers),
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+)
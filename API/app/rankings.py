@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from typing import Iterable
+from sqlalchemy import bindparam, case, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from .models import Player, PlayerRank, ScoreEvent
+
+# Building the shift for one changed player costs about as much as
+# rewriting this many rows in a rebuild; a shifted row costs about one
+PLAYER_COST_ROWS = 150
+
+def rebuild_rankings(db: Session):
+    """Recompute the whole player_rankings table from players.score."""
+    score = func.coalesce(Player.score, 0)
+    position = func.row_number().over(order_by=(score.desc(), Player.id)).label("position")
+    db.execute(delete(PlayerRank))
+    db.execute(
+        insert(PlayerRank).from_select(
+            ["player_id", "position", "score"],
+            select(Player.id, position, score)
+        )
+    )
+
+def ensure_rankings(db: Session):
+    """Rebuild the ranking table if it is out of sync with players (e.g. on a fresh database)."""
+    players = db.scalar(select(func.count(Player.id)))
+    ranked = db.scalar(select(func.count(PlayerRank.player_id)))
+    if players != ranked:
+        rebuild_rankings(db)
+        db.commit()
+
+def _ranking_key(score, player_id):
+    """Sort key of the ranking order: score descending, then player id."""
+    return -score, player_id
+
+def _position_before(score, player_id, excluded=()):
+    """
+    Position of the nearest ranking row ranked before the (score, player_id)
+    key, or 0, leaving out the `excluded` players: two index seeks.
+    """
+    other = PlayerRank.__table__.alias()
+    criteria = [other.c.player_id.notin_(excluded)] if excluded else []
+    same_score = select(other.c.position) \
+        .where(*criteria, other.c.score == score, other.c.player_id < player_id) \
+        .order_by(other.c.player_id.desc()).limit(1).scalar_subquery()
+    higher_score = select(other.c.position) \
+        .where(*criteria, other.c.score > score) \
+        .order_by(other.c.score.asc(), other.c.player_id.desc()).limit(1).scalar_subquery()
+    return func.coalesce(same_score, higher_score, 0)
+
+def _shifts(bounds: list) -> list:
+    """
+    Turn the (key, step, first, last) bounds of the changed players into
+    (first, last, shift) position ranges: every unchanged row in a range
+    moves by `shift`, the changed players now ranked before it less those
+    ranked before it until now. A bound opening a range starts it at position
+    `first`, one closing it ends it at `last` (None: the end of the ranking).
+    Ranges where the two counts cancel out, or holding no row, are left out.
+    """
+    bounds = sorted(bounds, key=lambda bound: bound[:2])
+    ranges, shift = [], 0
+    for (_, step, first, _), (_, _, _, last) in zip(bounds, bounds[1:] + [(None, 0, None, None)]):
+        shift += step
+        if shift and (last is None or first <= last):
+            ranges.append((first, last, shift))
+    return ranges
+
+def apply_score_changes(db: Session, player_ids: Iterable[int]):
+    """
+    Bring the ranking rows of the given players in line with their current
+    score, in a fixed number of statements whatever the batch size. Must run
+    in the same transaction as the score update.
+
+    A row only moves when changed players pass it: one UPDATE shifts the
+    positions between a player's old and new place by one per player that
+    crossed them. The changed players then take the free positions right
+    after the nearest unchanged row ranked before them. When that would
+    cost more than renumbering the whole table, the table is rebuilt instead.
+    """
+    player_ids = set(player_ids)
+    if not player_ids:
+        return
+    db.flush()
+
+    rank = PlayerRank.__table__.c
+    score = func.coalesce(Player.score, 0)
+    rows = db.execute(
+        select(
+            Player.id, score, PlayerRank.score, PlayerRank.position, _position_before(score, Player.id),
+            select(func.max(rank.position)).correlate(None).scalar_subquery(),
+        )
+        .outerjoin(PlayerRank, PlayerRank.player_id == Player.id)
+        .where(Player.id.in_(player_ids))
+    ).all()
+    ranked = (rows[0][5] if rows else None) or 0
+    # A player's new place sits right after the row ranked before its new
+    # score; its old place is its own row. Old places open and close ranges
+    # on the positions around them.
+    bounds, changed = [], []
+    for player_id, new, old, position, before, _ in rows:
+        if old == new:
+            continue
+        changed.append(player_id)
+        bounds.append((_ranking_key(new, player_id), 1, before + 1, before))
+        if old is not None:
+            bounds.append((_ranking_key(old, player_id), -1, position + 1, position - 1))
+    if not changed:
+        return
+
+    ranges = _shifts(bounds)
+    shifted = sum((ranked if last is None else last) - first + 1 for first, last, _ in ranges)
+    if shifted + PLAYER_COST_ROWS * len(changed) > ranked:
+        rebuild_rankings(db)
+        return
+
+    moved = [{"b_id": player_id, "b_score": new} for player_id, new, old, _, _, _ in rows if old is not None and old != new]
+    added = [{"player_id": player_id, "score": new} for player_id, new, old, _, _, _ in rows if old is None]
+    if moved:
+        db.execute(
+            update(PlayerRank.__table__)
+            .where(rank.player_id == bindparam("b_id"))
+            .values(score=bindparam("b_score")),
+            moved
+        )
+    if added:
+        db.execute(insert(PlayerRank), added)
+    if ranges:
+        # Ranges come in position order, so a row belongs to the first one it does not end after
+        shift = case(
+            *((rank.position <= last, step) for _, last, step in ranges[:-1]),
+            else_=ranges[-1][2],
+        ) if len(ranges) > 1 else ranges[0][2]
+        db.execute(
+            update(PlayerRank.__table__)
+            .where(
+                or_(*(rank.position >= first if last is None else rank.position.between(first, last)
+                      for first, last, _ in ranges)),
+                rank.player_id.notin_(changed),
+            )
+            .values(position=rank.position + shift)
+        )
+
+    # Changed players that follow the same unchanged row take the next positions in ranking order
+    positions = []
+    previous, offset = None, 0
+    for player_id, new, after in sorted(
+        db.execute(
+            select(PlayerRank.player_id, PlayerRank.score, _position_before(PlayerRank.score, PlayerRank.player_id, changed))
+            .where(PlayerRank.player_id.in_(changed))
+        ).all(),
+        key=lambda row: (row[2], _ranking_key(row[1], row[0]))
+    ):
+        offset = offset + 1 if after == previous else 1
+        previous = after
+        positions.append({"b_id": player_id, "b_position": after + offset})
+    db.execute(
+        update(PlayerRank.__table__)
+        .where(rank.player_id == bindparam("b_id"))
+        .values(position=bindparam("b_position")),
+        positions
+    )
+
+def rolling_rankings(as_of: datetime, weeks: int = 52):
+    """
+    Players ranked by the points credited in the `weeks` weeks up to `as_of`,
+    summed from the score ledger: (player_id, points, position). Only dated
+    entries count, so opening balances are left out.
+    """
+    points = func.sum(ScoreEvent.points)
+    return select(
+        ScoreEvent.subject_id.label("player_id"),
+        points.label("points"),
+        func.row_number().over(order_by=(points.desc(), ScoreEvent.subject_id)).label("position"),
+    ).where(
+        # A range scan of ix_score_events_window, which also holds the points
+        ScoreEvent.subject_type == "player",
+        ScoreEvent.awarded_at > as_of - timedelta(weeks=weeks),
+        ScoreEvent.awarded_at <= as_of,
+    ).group_by(ScoreEvent.subject_id).having(points > 0)
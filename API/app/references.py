@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+from sqlalchemy.orm import Session
+from .cache import create_cache_backend
+from .config import settings
+from .models import Phase, Referee, Team, Tournament
+
+# Snapshots of the reference rows, not bound to a session. Counters that
+# change on every registration (registered_count) are left out on purpose.
+
+@dataclass(frozen=True)
+class TournamentRef:
+    id: int
+    name: str
+    edition: str
+    start_date: datetime
+    end_date: datetime
+    min_level: int
+    min_referee_level: int
+    status: str
+    court_type: str
+
+@dataclass(frozen=True)
+class PhaseRef:
+    id: int
+    tournament_id: int
+    name: str
+    start_date: datetime
+    end_date: datetime
+
+@dataclass(frozen=True)
+class RefereeRef:
+    id: int
+    name: str
+    last_name: str
+    level: int
+    score: int
+    fiscal_code: str
+
+@dataclass(frozen=True)
+class TeamRef:
+    id: int
+    name: str
+    user_id: int
+    is_blocked: bool
+    disciplinary_actions_count: int
+
+def _columns(ref, model) -> list:
+    return [getattr(model, name) for name in ref.__dataclass_fields__]
+
+class ReferenceCache:
+    """
+    Read-through cache of reference rows on a pluggable backend. Every entity
+    has a version key; write endpoints call `invalidate` after their commit,
+    which bumps it, and entries stored for an older version are ignored.
+    Missing rows are not cached.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _get(self, entity: str, entity_id: int, load: Callable):
+        key = f"{entity}:{entity_id}"
+        version, value = self.backend.lookup(key)
+        if value is None:
+            value = load()
+            if value is not None:
+                self.backend.store(key, version, value)
+        return value
+
+    def invalidate(self, entity: str, entity_id: int):
+        self.backend.bump(f"{entity}:{entity_id}")
+
+    def tournament(self, db: Session, tournament_id: int) -> Optional[TournamentRef]:
+        def load():
+            row = db.query(*_columns(TournamentRef, Tournament)).filter(Tournament.id == tournament_id).first()
+            return TournamentRef(*row) if row else None
+        return self._get("tournament", tournament_id, load)
+
+    def tournament_phases(self, db: Session, tournament_id: int) -> Tuple[PhaseRef, ...]:
+        """Phases of a tournament; invalidated as ("tournament_phases", tournament_id)."""
+        def load():
+            rows = db.query(*_columns(PhaseRef, Phase)).filter(Phase.tournament_id == tournament_id).order_by(Phase.id)
+            return tuple(PhaseRef(*row) for row in rows)
+        return self._get("tournament_phases", tournament_id, load)
+
+    def referee(self, db: Session, referee_id: int) -> Optional[RefereeRef]:
+        def load():
+            row = db.query(*_columns(RefereeRef, Referee)).filter(Referee.id == referee_id).first()
+            return RefereeRef(*row) if row else None
+        return self._get("referee", referee_id, load)
+
+    def team(self, db: Session, team_id: int) -> Optional[TeamRef]:
+        def load():
+            row = db.query(*_columns(TeamRef, Team)).filter(Team.id == team_id).first()
+            return TeamRef(*row) if row else None
+        return self._get("team", team_id, load)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+reference_cache = ReferenceCache(create_cache_backend(
+    settings.REFERENCE_CACHE_BACKEND,
+    maxsize=settings.REFERENCE_CACHE_SIZE,
+    ttl=settings.REFERENCE_CACHE_TTL,
+    path=settings.REFERENCE_CACHE_PATH,
+))
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import List
+from sqlalchemy import delete, false, func, insert, literal, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .models import Player, Team, TeamTournament, Tournament, TournamentRegistration
+
+def reserve_places(db: Session, tournament_id: int, count: int) -> bool:
+    """
+    Take `count` places in a tournament with one conditional UPDATE, so that
+    concurrent registrations cannot push registered_count past capacity.
+    Returns False when the tournament does not have enough free places.
+    Does not commit.
+    """
+    result = db.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id, Tournament.registered_count + count <= Tournament.capacity)
+        .values(registered_count=Tournament.registered_count + count)
+    )
+    return result.rowcount == 1
+
+def release_places(db: Session, tournament_id: int, count: int):
+    """Give back places freed by removed registrations. Does not commit."""
+    db.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id)
+        .values(registered_count=Tournament.registered_count - count)
+    )
+
+def recount_registrations(db: Session):
+    """Recompute every registered_count from the registrations table. Does not commit."""
+    registered = select(func.count(TournamentRegistration.id)) \
+        .where(TournamentRegistration.tournament_id == Tournament.id) \
+        .scalar_subquery()
+    db.execute(update(Tournament).values(registered_count=registered))
+
+def register_players(db: Session, tournament_id: int, team_id: int, player_ids: List[int]) -> bool:
+    """
+    Register players of a team with a single INSERT ... SELECT. Only players of
+    `team_id` whose team is not blocked are selected, and pairs that already
+    exist are skipped through the unique (tournament_id, player_id) index, so
+    concurrent submissions cannot create duplicates. Places are taken first.
+    Returns False, leaving the transaction for the caller to roll back, unless
+    every requested player was registered. Does not commit.
+    """
+    requested = set(player_ids)
+    if not reserve_places(db, tournament_id, len(requested)):
+        return False
+    if not requested:
+        return True
+
+    eligible = select(literal(tournament_id), Player.id, literal(datetime.now())) \
+        .join(Team, Player.team_id == Team.id) \
+        .where(Player.team_id == team_id, Player.id.in_(requested), Team.is_blocked == false())
+    statement = sqlite_insert(TournamentRegistration) \
+        .from_select(["tournament_id", "player_id", "registration_date"], eligible) \
+        .on_conflict_do_nothing(index_elements=["tournament_id", "player_id"]) \
+        .returning(TournamentRegistration.player_id)
+    if len(db.execute(statement).all()) != len(requested):
+        return False
+
+    participation = sqlite_insert(TeamTournament).values(
+        team_id=team_id, tournament_id=tournament_id, players=len(requested)
+    )
+    db.execute(participation.on_conflict_do_update(
+        index_elements=["team_id", "tournament_id"],
+        set_={"players": TeamTournament.players + participation.excluded.players}
+    ))
+    return True
+
+def leave_team_tournament(db: Session, tournament_id: int, team_id: int):
+    """Count one registration of the team less, dropping the row at zero. Does not commit."""
+    db.execute(
+        update(TeamTournament)
+        .where(TeamTournament.team_id == team_id, TeamTournament.tournament_id == tournament_id)
+        .values(players=TeamTournament.players - 1)
+    )
+    db.execute(delete(TeamTournament).where(
+        TeamTournament.team_id == team_id,
+        TeamTournament.tournament_id == tournament_id,
+        TeamTournament.players <= 0
+    ))
+
+def rebuild_team_tournaments(db: Session):
+    """Recompute the team_tournaments table from the registrations. Does not commit."""
+    db.execute(delete(TeamTournament))
+    db.execute(insert(TeamTournament).from_select(
+        ["team_id", "tournament_id", "players"],
+        select(Player.team_id, TournamentRegistration.tournament_id, func.count())
+        .join(Player, TournamentRegistration.player_id == Player.id)
+        .where(Player.team_id.is_not(None))
+        .group_by(Player.team_id, TournamentRegistration.tournament_id)
+    ))
@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from .models import Match, Phase, Player, Referee, ScoreEvent, Tournament
+from . import rankings
+
+# Scoring system constants
+TOURNAMENT_SCORES = {
+    "FINAL": {
+        "winner": 100,
+        "runner_up": 60
+    },
+    "SEMIFINAL": {
+        "winner": 50,
+        "loser": 30
+    },
+    "QUARTERFINAL": {
+        "winner": 25,
+        "loser": 15
+    },
+    "ROUND_OF_16": {
+        "winner": 10,
+        "loser": 5
+    }
+}
+
+REFEREE_SCORING = {
+    "FINAL": 10,
+    "SEMIFINAL": 7,
+    "QUARTERFINAL": 5,
+    "ROUND_OF_16": 3,
+}
+
+SUBJECTS = {"player": Player, "referee": Referee}
+
+def load_completed_matches(tournament_id: int, db: Session):
+    """Completed matches of a tournament with their phase name, in a single query."""
+    return db.execute(
+        select(Match.id, Match.player1_id, Match.player2_id, Match.winner_id, Match.referee_id, Phase.name)
+        .join(Phase, Match.phase_id == Phase.id)
+        .where(Match.tournament_id == tournament_id, Match.status == "completed")
+    ).all()
+
+def match_score_events(matches):
+    """(match_id, subject_type, subject_id, points) for every credit earned in the given matches."""
+    events = []
+    for match_id, player1_id, player2_id, winner_id, referee_id, phase_name in matches:
+        points = TOURNAMENT_SCORES.get(phase_name)
+        if points and winner_id:
+            loser_id = player2_id if winner_id == player1_id else player1_id
+            events.append((match_id, "player", winner_id, points["winner"]))
+            # The final pays the losing player as runner-up
+            events.append((match_id, "player", loser_id, points.get("loser", points.get("runner_up", 0))))
+
+        if referee_id and phase_name in REFEREE_SCORING:
+            events.append((match_id, "referee", referee_id, REFEREE_SCORING[phase_name]))
+    return events
+
+def compute_score_deltas(events):
+    """Return ({player_id: points}, {referee_id: points}) summed over (..., subject_type, subject_id, points) events."""
+    deltas = {"player": defaultdict(int), "referee": defaultdict(int)}
+    for *_, subject_type, subject_id, points in events:
+        deltas[subject_type][subject_id] += points
+    return dict(deltas["player"]), dict(deltas["referee"])
+
+def _add_scores(db: Session, model, deltas: dict):
+    # One executemany UPDATE for all rows instead of a SELECT + UPDATE per row
+    deltas = {subject_id: delta for subject_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = model.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(score=table.c.score + bindparam("b_delta")),
+        [{"b_id": subject_id, "b_delta": delta} for subject_id, delta in deltas.items()]
+    )
+
+def _credit(db: Session, player_deltas: dict, referee_deltas: dict):
+    _add_scores(db, Player, player_deltas)
+    _add_scores(db, Referee, referee_deltas)
+    rankings.apply_score_changes(db, [player_id for player_id, delta in player_deltas.items() if delta])
+
+def _insert_events(db: Session, tournament_id: int, events, awarded_at: datetime):
+    if events:
+        db.execute(insert(ScoreEvent), [
+            {"tournament_id": tournament_id, "match_id": match_id, "subject_type": subject_type,
+             "subject_id": subject_id, "points": points, "awarded_at": awarded_at}
+            for match_id, subject_type, subject_id, points in events
+        ])
+
+def _record_tournament_events(tournament_id: int, db: Session):
+    matches = load_completed_matches(tournament_id, db)
+    # Points count from the end of the tournament, for the rolling rankings
+    awarded_at = db.scalar(select(Tournament.end_date).where(Tournament.id == tournament_id)) or datetime.now()
+    events = match_score_events(matches)
+    _insert_events(db, tournament_id, events, awarded_at)
+    return compute_score_deltas(events)
+
+def _remove_tournament_events(tournament_id: int, db: Session):
+    # A single indexed DELETE that hands back what it removed
+    removed = db.execute(
+        delete(ScoreEvent)
+        .where(ScoreEvent.tournament_id == tournament_id)
+        .returning(ScoreEvent.subject_type, ScoreEvent.subject_id, ScoreEvent.points)
+    ).all()
+    player_deltas, referee_deltas = compute_score_deltas(removed)
+    return _negate(player_deltas), _negate(referee_deltas)
+
+def _negate(deltas: dict) -> dict:
+    return {subject_id: -delta for subject_id, delta in deltas.items()}
+
+def _merge(*deltas: dict) -> dict:
+    merged = defaultdict(int)
+    for items in deltas:
+        for subject_id, delta in items.items():
+            merged[subject_id] += delta
+    return {subject_id: delta for subject_id, delta in merged.items() if delta}
+
+def apply_tournament_scores(tournament_id: int, db: Session):
+    """
+    Record the credits for every completed match of the tournament in the
+    score ledger and add them to the players' and referees' totals.
+    Does not commit: the caller decides the transaction boundary.
+    """
+    player_deltas, referee_deltas = _record_tournament_events(tournament_id, db)
+    _credit(db, player_deltas, referee_deltas)
+    return player_deltas, referee_deltas
+
+def revert_tournament_scores(tournament_id: int, db: Session):
+    """Remove the ledger entries of a tournament and take them off the totals. Does not commit."""
+    player_deltas, referee_deltas = _remove_tournament_events(tournament_id, db)
+    _credit(db, player_deltas, referee_deltas)
+    return player_deltas, referee_deltas
+
+def rescore_tournament(tournament_id: int, db: Session):
+    """
+    Replace the ledger entries of a tournament with the credits of its
+    current match results, e.g. after a result has been corrected. Only the
+    net change reaches the totals and the ranking. Does not commit.
+    """
+    removed = _remove_tournament_events(tournament_id, db)
+    added = _record_tournament_events(tournament_id, db)
+    player_deltas, referee_deltas = _merge(removed[0], added[0]), _merge(removed[1], added[1])
+    _credit(db, player_deltas, referee_deltas)
+    return player_deltas, referee_deltas
+
+def adjust_score(db: Session, subject_type: str, subject_id: int, points: int, awarded_at: Optional[datetime] = None):
+    """
+    Credit (or debit) points outside of any tournament, e.g. a manual
+    correction, through the ledger. Does not commit.
+    """
+    if not points:
+        return
+    db.execute(insert(ScoreEvent).values(
+        subject_type=subject_type, subject_id=subject_id, points=points,
+        awarded_at=awarded_at or datetime.now()
+    ))
+    deltas = {subject_id: points}
+    _credit(db, deltas if subject_type == "player" else {}, deltas if subject_type == "referee" else {})
+
+def rebuild_score_events(db: Session):
+    """
+    Rebuild the ledger of an existing database: the credits of every
+    completed tournament, plus an undated opening balance for whatever part
+    of the current totals they do not explain. Totals are left unchanged.
+    Does not commit.
+    """
+    db.execute(delete(ScoreEvent))
+    ended = select(Tournament.id, Tournament.end_date).where(Tournament.status == "completed")
+    for tournament_id, end_date in db.execute(ended).all():
+        _insert_events(db, tournament_id, match_score_events(load_completed_matches(tournament_id, db)), end_date)
+
+    for subject_type, model in SUBJECTS.items():
+        credited = select(func.coalesce(func.sum(ScoreEvent.points), 0)) \
+            .where(ScoreEvent.subject_type == subject_type, ScoreEvent.subject_id == model.id) \
+            .scalar_subquery()
+        balance = func.coalesce(model.score, 0) - credited
+        db.execute(insert(ScoreEvent).from_select(
+            ["subject_type", "subject_id", "points"],
+            select(literal(subject_type), model.id, balance).where(balance != 0)
+        ))
@@ -1,26 +1,39 @@
 from sqlalchemy.orm import Session
 from .models import (
-    Base, engine, User, Team, Player, Referee, Tournament,
-    UserType, TournamentRegistration, RefereeAvailability, Match, MatchPhase, Phase
+    Base, engine, User, Team, Player, PlayerRank, Referee, Tournament,
+    UserType, TournamentRegistration, RefereeAvailability, Match, MatchPhase, Phase, ScoreEvent
 )
 from datetime import datetime, timedelta
 import random
+from .rankings import rebuild_rankings
+from .registrations import recount_registrations, rebuild_team_tournaments
+from .scoring import rebuild_score_events
+from .migrations import upgrade_schema
+from .passwords import hash_password_sync
+from .versions import resource_versions
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables (and upgrade databases from older versions)
+upgrade_schema(engine)
 
 def seed_database():
+    # One hash per distinct password; bcrypt is deliberately slow
+    admin_password = hash_password_sync("admin123")
+    team_password = hash_password_sync("team123")
+    referee_password = hash_password_sync("referee123")
+
     # Create a session
     db = Session(bind=engine)
     
     try:
         # Clear existing data
+        db.query(ScoreEvent).delete()
         db.query(Match).delete()
         db.query(Phase).delete()
         db.query(RefereeAvailability).delete()
         db.query(TournamentRegistration).delete()
         db.query(Tournament).delete()
         db.query(Referee).delete()
+        db.query(PlayerRank).delete()
         db.query(Player).delete()
         db.query(Team).delete()
         db.query(User).delete()
@@ -29,7 +42,7 @@ def seed_database():
         # Create admin user
         admin_user = User(
             email="admin@tennishub.com",
-            password="admin123",
+            password=admin_password,
             user_type=UserType.ADMIN
         )
         db.add(admin_user)
@@ -62,7 +75,7 @@ def seed_database():
         for team_data in teams:
             team_user = User(
                 email=team_data["email"],
-                password="team123",
+                password=team_password,
                 user_type=UserType.TEAM
             )
             db.add(team_user)
@@ -134,7 +147,7 @@ def seed_database():
             db.add(referee)
             referee_user = User(
                 email=f"{referee.name.lower()}.{referee.last_name.lower()}@tennishub.com",
-                password="referee123",
+                password=referee_password,
                 user_type=UserType.REFEREE
             )
             db.add(referee_user)
@@ -248,7 +261,8 @@ def seed_database():
                 court_number=(i % 4) + 1,
                 status="completed",
                 score=score,
-                winner_id=winner.id
+                winner_id=winner.id,
+                bracket_slot=i
             )
             db.add(match)
 
@@ -272,7 +286,8 @@ def seed_database():
                 court_number=(i % 2) + 1,
                 status="completed",
                 score=score,
-                winner_id=winner.id
+                winner_id=winner.id,
+                bracket_slot=i
             )
             db.add(match)
 
@@ -294,7 +309,8 @@ def seed_database():
                 court_number=1,
                 status="completed",
                 score=score,
-                winner_id=winner.id
+                winner_id=winner.id,
+                bracket_slot=i
             )
             db.add(match)
 
@@ -310,11 +326,19 @@ def seed_database():
             court_number=1,
             status="completed",
             score="6-4, 7-6",
-            winner_id=players[0].id
+            winner_id=players[0].id,
+            bracket_slot=0
         )
         db.add(final_match)
-        
+        db.flush()
+
+        recount_registrations(db)
+        rebuild_team_tournaments(db)
+        rebuild_score_events(db)
+        rebuild_rankings(db)
         db.commit()
+        # Every row was replaced: retire all tags, not only those of the tables the events saw
+        resource_versions.rotate()
         print("Database seeded successfully!")
         
     except Exception as e:
@@ -0,0 +1,265 @@
+"""
+Synthetic large-scale dataset generator.
+
+Builds a reproducible database of N teams, players, referees and tournaments
+with fully played brackets, using bulk executemany inserts.
+
+Usage: python -m app.synthetic --teams 2000 --tournaments 8000 --draw-size 128 --seed 42
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+import bcrypt
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from .models import (
+    Base, User, Team, Player, Referee, Tournament, TournamentRegistration,
+    Phase, Match, ScoreEvent, UserType
+)
+from .bracket import ROUND_NAMES, rounds_for
+from .rankings import rebuild_rankings
+from .registrations import rebuild_team_tournaments
+from .scoring import compute_score_deltas, match_score_events
+from .versions import resource_versions
+
+CHUNK_SIZE = 50000
+COURT_TYPES = ["clay", "hard", "grass", "carpet"]
+SET_SCORES = [(6, 0), (6, 1), (6, 2), (6, 3), (6, 4), (7, 5), (7, 6)]
+SCORE_POOL_SIZE = 1024
+DEFAULT_DATABASE_URL = "sqlite:///./tennis_hub_synthetic.db"
+PASSWORD = "synthetic123"
+BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+# Column order of the generated row tuples
+COLUMNS = {
+    User: ("id", "email", "password", "user_type"),
+    Team: ("id", "name", "user_id", "is_blocked", "disciplinary_actions_count"),
+    Player: ("id", "name", "level", "score", "team_id"),
+    Referee: ("id", "name", "last_name", "level", "score", "fiscal_code"),
+    Tournament: ("id", "name", "edition", "start_date", "end_date", "min_level", "min_referee_level",
+                 "status", "court_type", "spectator_count", "registered_count", "capacity"),
+    TournamentRegistration: ("tournament_id", "player_id", "registration_date"),
+    Phase: ("id", "tournament_id", "name", "start_date", "end_date"),
+    Match: ("id", "tournament_id", "player1_id", "player2_id", "referee_id", "phase_id", "winner_id",
+            "match_date", "court_number", "score", "status", "bracket_slot"),
+    ScoreEvent: ("tournament_id", "match_id", "subject_type", "subject_id", "points", "awarded_at"),
+}
+
+def _bulk_insert(conn, model, rows):
+    """
+    COPY-style load: row tuples go straight into the driver's executemany,
+    skipping per-row statement compilation. Only columns whose type needs a
+    bind processor (dates, enums) are converted.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    columns = COLUMNS[model]
+    processors = {}
+    for index, column in enumerate(columns):
+        process = table.c[column].type.dialect_impl(conn.dialect).bind_processor(conn.dialect)
+        if process:
+            # Dates repeat across thousands of rows, format each one only once
+            processors[index] = lru_cache(maxsize=65536)(process)
+
+    statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    cursor = conn.connection.cursor()
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        for i, process in processors.items():
+            chunk = [row[:i] + (process(row[i]),) + row[i + 1:] for row in chunk]
+        cursor.executemany(statement, chunk)
+    cursor.close()
+
+def _match_score(rng: random.Random) -> str:
+    """Best-of-three score won by the first player."""
+    sets = [rng.choice(SET_SCORES), rng.choice(SET_SCORES)]
+    if rng.random() < 0.35:
+        # Three-setter: the loser takes the middle set
+        sets.insert(1, tuple(reversed(rng.choice(SET_SCORES))))
+    return ", ".join(f"{a}-{b}" for a, b in sets)
+
+def _reverse_score(score: str) -> str:
+    return ", ".join("-".join(reversed(games.split("-"))) for games in score.split(", "))
+
+class SyntheticDataset:
+    def __init__(self, teams: int, players_per_team: int, referees: int, tournaments: int,
+                 draw_size: int, completed_ratio: float, seed: int, start_date: datetime):
+        if draw_size not in ROUND_NAMES:
+            raise ValueError(f"draw size must be one of {sorted(ROUND_NAMES)}")
+        self.teams = teams
+        self.players_per_team = players_per_team
+        self.referees = referees
+        self.tournaments = tournaments
+        self.draw_size = draw_size
+        self.completed_ratio = completed_ratio
+        self.rng = random.Random(seed)
+        self.start_date = start_date
+        self.rows = {model: [] for model in COLUMNS}
+
+    def build(self):
+        self._build_people()
+        self._build_tournaments()
+        return self.rows
+
+    def _build_people(self):
+        rng = self.rng
+        # Salt drawn from the seeded generator so the whole file is reproducible
+        salt = "$2b$04$" + "".join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + "O"
+        password = bcrypt.hashpw(PASSWORD.encode(), salt.encode()).decode()
+        users = self.rows[User]
+        users.append((1, "admin@tennishub.com", password, UserType.ADMIN))
+
+        for team_id in range(1, self.teams + 1):
+            user_id = len(users) + 1
+            users.append((user_id, f"team{team_id}@synthetic.tennishub.com", password, UserType.TEAM))
+            self.rows[Team].append((team_id, f"Team {team_id}", user_id, False, 0))
+
+        # Index 0 is unused so that levels[player_id] works
+        self.levels = [0] + [rng.randint(1, 7) for _ in range(self.teams * self.players_per_team)]
+        self.referee_levels = [0] + [rng.randint(1, 5) for _ in range(self.referees)]
+        for referee_id in range(1, self.referees + 1):
+            users.append((len(users) + 1, f"referee{referee_id}@synthetic.tennishub.com", password, UserType.REFEREE))
+
+    def _build_tournaments(self):
+        rng = self.rng
+        levels = self.levels
+        player_count = len(levels) - 1
+        rounds = rounds_for(self.draw_size)
+        referees_by_level = {
+            level: [r for r in range(1, self.referees + 1) if self.referee_levels[r] >= level]
+                   or list(range(1, self.referees + 1))
+            for level in range(1, 6)
+        }
+        # Scores come from a seeded pool; formatting one per match dominates otherwise
+        winning_scores = [_match_score(rng) for _ in range(SCORE_POOL_SIZE)]
+        losing_scores = [_reverse_score(score) for score in winning_scores]
+        # Chance that player 1 wins by level difference: higher level wins more often
+        p1_chance = {diff: min(0.9, max(0.1, 0.5 + 0.08 * diff)) for diff in range(-6, 7)}
+
+        tournaments, registrations = self.rows[Tournament], self.rows[TournamentRegistration]
+        phases, matches = self.rows[Phase], self.rows[Match]
+        completed = int(self.tournaments * self.completed_ratio)
+        events = self.rows[ScoreEvent]
+
+        for tournament_id in range(1, self.tournaments + 1):
+            start = self.start_date + timedelta(days=7 * (tournament_id - 1) // 4)
+            is_completed = tournament_id <= completed
+            min_referee_level = rng.randint(1, 3)
+            court_type, spectators = rng.choice(COURT_TYPES), rng.randint(100, 20000)
+            end = start + timedelta(days=2 * len(rounds))
+
+            # Completed tournaments have a full draw, upcoming ones partial registrations
+            entrants = rng.sample(range(1, player_count + 1), self.draw_size if is_completed else rng.randint(0, self.draw_size - 1))
+            tournaments.append((
+                tournament_id, f"Synthetic Open {tournament_id}", str(start.year),
+                start, end, 1, min_referee_level,
+                "completed" if is_completed else "upcoming",
+                court_type, spectators, len(entrants), self.draw_size,
+            ))
+            registered_on = start - timedelta(days=14)
+            registrations.extend((tournament_id, player_id, registered_on) for player_id in entrants)
+            if not is_completed:
+                continue
+
+            referees = referees_by_level[min_referee_level]
+            played = []
+            alive = entrants
+            for round_index, phase_name in enumerate(rounds):
+                phase_id = len(phases) + 1
+                phase_start = start + timedelta(days=2 * round_index)
+                phases.append((phase_id, tournament_id, phase_name, phase_start, phase_start + timedelta(days=1)))
+                # Eight courts, a new session every two hours
+                sessions = [phase_start + timedelta(hours=2 * i) for i in range(len(alive) // 16 + 1)]
+                winners = []
+                for slot in range(len(alive) // 2):
+                    player1, player2 = alive[2 * slot], alive[2 * slot + 1]
+                    # One draw per match decides the winner, the score and the referee
+                    draw = rng.random()
+                    score_index = int(draw * 1e6) % SCORE_POOL_SIZE
+                    referee_id = referees[int(draw * 1e9) % len(referees)]
+                    if draw < p1_chance[levels[player1] - levels[player2]]:
+                        winner, score = player1, winning_scores[score_index]
+                    else:
+                        winner, score = player2, losing_scores[score_index]
+                    match_id = len(matches) + 1
+                    matches.append((
+                        match_id, tournament_id, player1, player2, referee_id, phase_id, winner,
+                        sessions[slot // 8], slot % 8 + 1, score, "completed", slot,
+                    ))
+                    played.append((match_id, player1, player2, winner, referee_id, phase_name))
+                    winners.append(winner)
+                alive = winners
+            events.extend(
+                (tournament_id, match_id, subject_type, subject_id, points, end)
+                for match_id, subject_type, subject_id, points in match_score_events(played)
+            )
+
+        # Scores are the totals of the ledger: the points earned in the generated brackets
+        player_deltas, referee_deltas = compute_score_deltas(event[2:5] for event in events)
+        for player_id in range(1, player_count + 1):
+            team_id = (player_id - 1) // self.players_per_team + 1
+            self.rows[Player].append((player_id, f"Player {player_id}", levels[player_id],
+                                      player_deltas.get(player_id, 0), team_id))
+        for referee_id in range(1, self.referees + 1):
+            self.rows[Referee].append((referee_id, f"Referee{referee_id}", "Synthetic", self.referee_levels[referee_id],
+                                       referee_deltas.get(referee_id, 0), f"SYN{referee_id:013d}"))
+
+def load(url: str, rows: dict):
+    engine = create_engine(url)
+
+    @event.listens_for(engine, "connect")
+    def fast_load(dbapi_connection, connection_record):
+        # The database is rebuilt from scratch, durability is not needed while loading
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for model, model_rows in rows.items():
+            _bulk_insert(conn, model, model_rows)
+    with Session(bind=engine) as db:
+        rebuild_team_tournaments(db)
+        rebuild_rankings(db)
+        db.commit()
+    engine.dispose()
+    # Tags handed out for the previous content must not match any more
+    resource_versions.rotate()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic TennisHub database")
+    # Never the application database by default: loading drops every table first
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--players-per-team", type=int, default=10)
+    parser.add_argument("--referees", type=int, default=200)
+    parser.add_argument("--tournaments", type=int, default=100)
+    parser.add_argument("--draw-size", type=int, default=16)
+    parser.add_argument("--completed-ratio", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=datetime(2023, 1, 2))
+    args = parser.parse_args()
+
+    if args.teams * args.players_per_team < args.draw_size:
+        parser.error("not enough players for one draw")
+
+    started = time.perf_counter()
+    rows = SyntheticDataset(
+        args.teams, args.players_per_team, args.referees, args.tournaments,
+        args.draw_size, args.completed_ratio, args.seed, args.start_date
+    ).build()
+    generated = time.perf_counter()
+    load(args.database_url, rows)
+    loaded = time.perf_counter()
+
+    counts = ", ".join(f"{len(model_rows)} {model.__tablename__}" for model, model_rows in rows.items())
+    print(f"Generated {counts}")
+    print(f"Generation {generated - started:.1f}s, load {loaded - generated:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+from itertools import chain
+from typing import Iterable, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_mapper
+from .cache import create_cache_backend
+from .config import settings
+
+class ResourceVersions:
+    """
+    Write counter and last commit time per table, kept in a cache backend.
+    Session events bump the tables a transaction wrote to once it has
+    committed, so readers that take the versions before querying never pair
+    a version with older data. With the local backend the counters only see
+    the writes of this process, so running several workers needs the shared
+    sqlite backend; the epoch keeps tags handed out for an earlier set of
+    counters from matching. Writes that bypass the session events (schema
+    upgrades, reseeding) call `rotate`, which is stored in the backend
+    next to the counters, so every worker and every restart sees it.
+    """
+
+    # Backend key of the rotation counter, read along with the table counters
+    ROTATION_KEY = "epoch"
+
+    def __init__(self, backend):
+        self.backend = backend
+        # Tables this process has written or read, for `stats`
+        self._tables = set()
+        self._lock = threading.Lock()
+
+    @property
+    def epoch(self) -> str:
+        return self.backend.epoch
+
+    def _versions(self, tables) -> list:
+        """[(rotation, rotated at), (version, bumped at) of each table...] in one backend read."""
+        with self._lock:
+            self._tables.update(tables)
+        return self.backend.versions([self.ROTATION_KEY] + [f"table:{table}" for table in tables])
+
+    def rotate(self):
+        """Retire every tag handed out so far, after the data changed outside the session events."""
+        self.backend.bump(self.ROTATION_KEY)
+
+    def bump(self, tables: Iterable[str]):
+        tables = list(tables)
+        with self._lock:
+            self._tables.update(tables)
+        for table in tables:
+            self.backend.bump(f"table:{table}")
+
+    def snapshot(self, tables: Iterable[str]) -> Tuple[str, float]:
+        """Weak ETag and last commit time (epoch seconds) of the data in `tables`."""
+        (rotation, _), *counters = versions = self._versions(list(tables))
+        modified = max(bumped_at or self.backend.created for _, bumped_at in versions)
+        return f'W/"{self.epoch}.{rotation}-{"-".join(str(version) for version, _ in counters)}"', modified
+
+    def stats(self) -> dict:
+        with self._lock:
+            tables = sorted(self._tables)
+        (rotation, rotated_at), *versions = self._versions(tables)
+        return {
+            "epoch": self.epoch,
+            "rotation": rotation,
+            "rotated_at": rotated_at,
+            "backend": self.backend.name,
+            "tables": {
+                table: {"version": version, "modified": bumped_at}
+                for table, (version, bumped_at) in zip(tables, versions)
+                if version
+            },
+        }
+
+resource_versions = ResourceVersions(create_cache_backend(
+    settings.REFERENCE_CACHE_BACKEND,
+    maxsize=settings.REFERENCE_CACHE_SIZE,
+    ttl=settings.REFERENCE_CACHE_TTL,
+    path=settings.REFERENCE_CACHE_PATH,
+))
+
+def _written_tables(session: Session) -> set:
+    return session.info.setdefault("written_tables", set())
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    # Still the pre-flush state: the objects this flush inserted, updated or deleted
+    tables = _written_tables(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tables.update(table.name for table in object_mapper(obj).tables)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement_table(orm_execute_state):
+    # insert()/update()/delete() statements run through the session skip the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _written_tables(orm_execute_state.session).add(table.name)
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        resource_versions.bump(tables)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_tables(session):
+    session.info.pop("written_tables", None)
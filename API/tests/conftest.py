@@ -0,0 +1,80 @@
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.jobs import job_runner
+from app.main import app
+from app.models import Tournament, create_async_db_engine, create_db_engine, get_async_db, get_db, get_write_db
+from app.references import reference_cache
+from app.synthetic import SyntheticDataset, load
+
+@pytest.fixture(scope="session")
+def synthetic_rows():
+    """200 players in 20 teams, 40 tournaments with 16-player draws, the first 32 completed."""
+    return SyntheticDataset(
+        teams=20, players_per_team=10, referees=20, tournaments=40, draw_size=16,
+        completed_ratio=0.8, seed=42, start_date=datetime(2023, 1, 2)
+    ).build()
+
+def _session_dependency(session_factory):
+    def dependency():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+    return dependency
+
+@pytest.fixture
+def api(synthetic_rows, tmp_path):
+    """
+    The API on a fresh copy of the synthetic database, through dependency
+    overrides. Yields (client, write session factory). The job worker is not
+    started: tests run the queued jobs with job_runner.run.
+    """
+    url = f"sqlite:///{tmp_path / 'tennis_hub.db'}"
+    load(url, synthetic_rows)
+    reference_cache.clear()
+
+    read_engine = create_db_engine(url)
+    write_engine = create_db_engine(url, writer=True)
+    async_engine = create_async_db_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    WriteSession = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+    AsyncSessionTest = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def async_db():
+        async with AsyncSessionTest() as db:
+            yield db
+
+    app.dependency_overrides.update({
+        get_db: _session_dependency(sessionmaker(autocommit=False, autoflush=False, bind=read_engine)),
+        get_write_db: _session_dependency(WriteSession),
+        get_async_db: async_db,
+    })
+    session_factory, job_runner.session_factory = job_runner.session_factory, WriteSession
+    try:
+        # Not used as a context manager: the startup hook would open the configured database
+        yield TestClient(app), WriteSession
+    finally:
+        app.dependency_overrides.clear()
+        job_runner.session_factory = session_factory
+        read_engine.dispose()
+        write_engine.dispose()
+        async_engine.sync_engine.dispose()
+
+@pytest.fixture
+def completed_tournament_id(api):
+    """A completed synthetic tournament, with its whole bracket played."""
+    with api[1]() as db:
+        (tournament_id,) = db.query(Tournament.id).filter(Tournament.status == "completed") \
+            .order_by(Tournament.id).first()
+        return tournament_id
+
+@pytest.fixture
+def upcoming_tournament_id(api):
+    """The upcoming synthetic tournament with the most free places."""
+    with api[1]() as db:
+        (tournament_id,) = db.query(Tournament.id).filter(Tournament.status == "upcoming") \
+            .order_by((Tournament.capacity - Tournament.registered_count).desc(), Tournament.id).first()
+        return tournament_id
@@ -0,0 +1,26 @@
+from collections import OrderedDict
+from app import auth
+from app.cache import LRUCache
+
+def test_subject_map_stays_within_the_principal_cache(monkeypatch):
+    cache = LRUCache(maxsize=2)
+    monkeypatch.setattr(auth, "principal_cache", cache)
+    monkeypatch.setattr(auth, "_subjects_by_user_id", OrderedDict())
+
+    for user_id in (1, 2, 3):
+        subject = f"user{user_id}@example.com"
+        auth._remember_subject(user_id, subject)
+        cache.set(subject, auth.Principal(user_id, subject, auth.UserType.TEAM))
+
+    assert list(auth._subjects_by_user_id) == [2, 3]
+    # Dropped from the map, so dropped from the cache: it could not be invalidated any more
+    assert cache.get("user1@example.com") is None
+
+    auth.invalidate_principal(3)
+    assert cache.get("user3@example.com") is None
+    assert cache.get("user2@example.com").id == 2
+
+def test_principal_cache_counters_are_exposed(api):
+    client, _ = api
+    stats = client.get("/api/auth/principal-cache").json()
+    assert {"hits", "misses", "evictions", "hit_ratio"} <= stats.keys()
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from app.models import Match, Phase, Referee, Tournament
+
+def _semifinal_tournament(WriteSession):
+    """An upcoming synthetic tournament with empty SEMIFINAL and FINAL phases, and a referee qualified for it."""
+    with WriteSession() as db:
+        (referee_id,) = db.query(Referee.id).order_by(Referee.level.desc(), Referee.id).first()
+        tournament = db.query(Tournament).filter(Tournament.status == "upcoming").first()
+        start = datetime(2030, 1, 1)
+        phases = {
+            name: Phase(tournament_id=tournament.id, name=name, start_date=start + timedelta(days=i),
+                        end_date=start + timedelta(days=i + 1))
+            for i, name in enumerate(["SEMIFINAL", "FINAL"])
+        }
+        db.add_all(phases.values())
+        db.commit()
+        return tournament.id, phases["SEMIFINAL"].id, phases["FINAL"].id, referee_id
+
+def test_created_matches_advance_winner_into_next_slot(api):
+    client, WriteSession = api
+    tournament_id, semifinal_id, final_id, referee_id = _semifinal_tournament(WriteSession)
+
+    match_ids = []
+    for slot, (player1, player2) in enumerate([(1, 2), (3, 4)]):
+        response = client.post(f"/api/tournaments/{tournament_id}/matches", json={
+            "player1_id": player1, "player2_id": player2, "referee_id": referee_id, "phase_id": semifinal_id,
+            "match_date": "2030-01-01T10:00:00", "court_number": slot + 1, "status": "scheduled",
+            "bracket_slot": slot,
+        })
+        assert response.status_code == 200, response.text
+        match_ids.append(response.json()["match_id"])
+
+    first = client.put(f"/api/matches/{match_ids[0]}", json={"winner_id": 2, "score": "6-4, 6-4", "status": "completed"})
+    assert first.status_code == 200
+    # The final is only created once both semifinals are over
+    assert "next_match_id" not in first.json()
+
+    second = client.put(f"/api/matches/{match_ids[1]}", json={"winner_id": 3, "score": "6-1, 6-2", "status": "completed"})
+    assert second.status_code == 200
+    final_match_id = second.json()["next_match_id"]
+
+    with WriteSession() as db:
+        final = db.get(Match, final_match_id)
+        assert (final.phase_id, final.bracket_slot) == (final_id, 0)
+        assert (final.player1_id, final.player2_id) == (2, 3)
+
+    # A corrected semifinal result moves the new winner into the same slot
+    corrected = client.put(f"/api/matches/{match_ids[0]}", json={"winner_id": 1})
+    assert corrected.json()["next_match_id"] == final_match_id
+    with WriteSession() as db:
+        assert db.get(Match, final_match_id).player1_id == 1
+
+def test_corrected_result_does_not_advance_into_a_completed_match(api):
+    client, WriteSession = api
+    tournament_id, semifinal_id, final_id, referee_id = _semifinal_tournament(WriteSession)
+    with WriteSession() as db:
+        semifinals = [
+            Match(tournament_id=tournament_id, player1_id=player1, player2_id=player2, referee_id=referee_id,
+                  phase_id=semifinal_id, match_date=datetime(2030, 1, 1, 10), court_number=slot + 1,
+                  status="completed", score="6-4, 6-4", winner_id=player1, bracket_slot=slot)
+            for slot, (player1, player2) in enumerate([(1, 2), (3, 4)])
+        ]
+        final = Match(tournament_id=tournament_id, player1_id=1, player2_id=3, referee_id=referee_id,
+                      phase_id=final_id, match_date=datetime(2030, 1, 2, 10), court_number=1,
+                      status="completed", score="6-3, 6-3", winner_id=1, bracket_slot=0)
+        db.add_all(semifinals + [final])
+        db.commit()
+        semifinal_match_id, final_match_id = semifinals[0].id, final.id
+
+    # The final has been played: the corrected semifinal leaves it as it is
+    response = client.put(f"/api/matches/{semifinal_match_id}", json={"winner_id": 2})
+    assert response.status_code == 200
+    assert "next_match_id" not in response.json()
+    with WriteSession() as db:
+        assert db.get(Match, final_match_id).player1_id == 1
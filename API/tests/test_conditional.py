@@ -0,0 +1,42 @@
+from app.models import Match
+from app.versions import resource_versions
+
+TOURNAMENT = {
+    "name": "Conditional Open", "edition": "2030", "start_date": "2030-05-01T09:00:00",
+    "end_date": "2030-05-08T18:00:00", "min_level": 1, "min_referee_level": 1, "court_type": "grass",
+}
+
+def _revalidate(client, etag):
+    return client.get("/api/tournaments", headers={"If-None-Match": etag})
+
+def test_tag_changes_with_the_tables_the_list_reads(api, completed_tournament_id):
+    client, WriteSession = api
+    first = client.get("/api/tournaments")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    unchanged = _revalidate(client, etag)
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["ETag"] == etag
+
+    # A write to a table the list does not read keeps the tag
+    with WriteSession() as db:
+        (match_id,) = db.query(Match.id).filter(Match.tournament_id == completed_tournament_id).first()
+    assert client.put(f"/api/matches/{match_id}", json={"score": "6-0, 6-0"}).status_code == 200
+    assert _revalidate(client, etag).status_code == 304
+
+    # A new tournament does not
+    created = client.post("/api/tournaments", json=TOURNAMENT).json()["tournament_id"]
+    changed = _revalidate(client, etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert created in {row["id"] for row in changed.json()}
+    assert _revalidate(client, changed.headers["ETag"]).status_code == 304
+
+def test_rotation_retires_every_tag(api):
+    client, _ = api
+    etag = client.get("/api/tournaments").headers["ETag"]
+    # What a reseed or a schema upgrade does after writing outside the sessions
+    resource_versions.rotate()
+    assert _revalidate(client, etag).status_code == 200
@@ -0,0 +1,60 @@
+from app.models import Match, Phase, Player, Team
+
+def _open_tournament(client, WriteSession, players):
+    """A new tournament open to every level, with `players` players of one team registered."""
+    response = client.post("/api/tournaments", json={
+        "name": "Draw Open", "edition": "2030", "start_date": "2030-03-01T09:00:00",
+        "end_date": "2030-03-10T18:00:00", "min_level": 0, "min_referee_level": 0, "court_type": "clay",
+    })
+    assert response.status_code == 200, response.text
+    tournament_id = response.json()["tournament_id"]
+    with WriteSession() as db:
+        team_id, = db.query(Team.id).filter(Team.is_blocked.is_(False)).order_by(Team.id).first()
+        player_ids = [player_id for (player_id,) in
+                      db.query(Player.id).filter(Player.team_id == team_id).order_by(Player.id).limit(players)]
+    response = client.post(f"/api/tournaments/{tournament_id}/register-team",
+                           json={"team_id": team_id, "player_ids": player_ids})
+    assert response.status_code == 200, response.text
+    return tournament_id
+
+def test_draw_creates_the_bracket_and_the_first_round(api):
+    client, WriteSession = api
+    tournament_id = _open_tournament(client, WriteSession, 4)
+
+    response = client.post(f"/api/tournaments/{tournament_id}/draw", json={"courts": 1})
+    assert response.status_code == 200, response.text
+    draw = response.json()
+    assert (draw["draw_size"], draw["matches_created"]) == (4, 2)
+    assert list(draw["phases"]) == ["SEMIFINAL", "FINAL"]
+
+    with WriteSession() as db:
+        # The placeholder phase of the new tournament is gone: no empty column in the bracket
+        phases = {name: phase_id for phase_id, name in
+                  db.query(Phase.id, Phase.name).filter(Phase.tournament_id == tournament_id)}
+        assert phases == draw["phases"]
+        matches = db.query(Match).filter(Match.tournament_id == tournament_id).order_by(Match.bracket_slot).all()
+        assert [(match.phase_id, match.bracket_slot) for match in matches] == [(phases["SEMIFINAL"], 0), (phases["SEMIFINAL"], 1)]
+        # One court: the matches follow each other
+        assert matches[1].match_date > matches[0].match_date
+        # The two best players can only meet in the final
+        best = [player_id for (player_id,) in db.query(Player.id).filter(
+            Player.id.in_([player_id for match in matches for player_id in (match.player1_id, match.player2_id)])
+        ).order_by(Player.score.desc(), Player.id).limit(2)]
+        assert {matches[0].player1_id, matches[1].player1_id} == set(best)
+
+    # The cached phase list, which the bracket columns come from, follows too
+    listed = client.get(f"/api/tournaments/{tournament_id}/phases").json()
+    assert sorted(phase["name"] for phase in listed) == ["FINAL", "SEMIFINAL"]
+
+    # A second draw would duplicate the matches
+    assert client.post(f"/api/tournaments/{tournament_id}/draw", json={}).status_code == 400
+
+def test_draw_rejects_invalid_requests(api):
+    client, WriteSession = api
+    tournament_id = _open_tournament(client, WriteSession, 3)
+
+    assert client.post(f"/api/tournaments/{tournament_id}/draw", json={"courts": 0}).status_code == 422
+    response = client.post(f"/api/tournaments/{tournament_id}/draw", json={})
+    assert response.status_code == 400
+    assert response.json()["detail"].endswith("found 3")
+    assert client.post("/api/tournaments/999999/draw", json={}).status_code == 404
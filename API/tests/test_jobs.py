@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, inspect, update
+from app.jobs import JobRunner, job_runner
+from app.models import Job, Player, ScoreEvent, Tournament
+
+def _scores(db):
+    return dict(db.query(Player.id, Player.score))
+
+def _ledger_totals(db):
+    totals = dict(
+        db.query(ScoreEvent.subject_id, func.sum(ScoreEvent.points))
+        .filter(ScoreEvent.subject_type == "player").group_by(ScoreEvent.subject_id)
+    )
+    return {player_id: totals.get(player_id, 0) for (player_id,) in db.query(Player.id)}
+
+def _reopened(client, WriteSession, tournament_id):
+    """Reopen a completed tournament; returns the player scores it had."""
+    with WriteSession() as db:
+        scores = _scores(db)
+    assert client.put(f"/api/tournaments/{tournament_id}/reopen").status_code == 200
+    return scores
+
+def test_resubmitted_completion_returns_the_queued_job(api, completed_tournament_id):
+    client, WriteSession = api
+    _reopened(client, WriteSession, completed_tournament_id)
+
+    first = client.put(f"/api/tournaments/{completed_tournament_id}/complete")
+    second = client.put(f"/api/tournaments/{completed_tournament_id}/complete")
+    assert first.status_code == second.status_code == 202
+    assert first.json()["job_id"] == second.json()["job_id"]
+    assert first.json()["status"] == "queued"
+    with WriteSession() as db:
+        assert db.query(Job).filter(Job.key == f"complete_tournament:{completed_tournament_id}").count() == 1
+
+def test_submitted_job_is_readable_after_commit(api):
+    _, WriteSession = api
+    with WriteSession() as db:
+        job = job_runner.submit(db, "complete_tournament", "complete_tournament:999", {"tournament_id": 999})
+        # Nothing left to load lazily, which would start a new transaction
+        assert not inspect(job).expired_attributes
+        assert job.status == "queued"
+
+def test_completion_job_run_twice_credits_once(api, completed_tournament_id):
+    client, WriteSession = api
+    scores = _reopened(client, WriteSession, completed_tournament_id)
+    job_id = client.put(f"/api/tournaments/{completed_tournament_id}/complete").json()["job_id"]
+
+    job_runner.run(job_id)
+    job_runner.run(job_id)
+
+    with WriteSession() as db:
+        assert db.get(Job, job_id).status == "succeeded"
+        assert db.get(Job, job_id).attempts == 1
+        assert _scores(db) == scores == _ledger_totals(db)
+
+def test_interrupted_job_is_queued_again_and_credits_once(api, completed_tournament_id):
+    client, WriteSession = api
+    scores = _reopened(client, WriteSession, completed_tournament_id)
+    job_id = client.put(f"/api/tournaments/{completed_tournament_id}/complete").json()["job_id"]
+    # A process stopped after claiming the job: its work was never committed
+    with WriteSession() as db:
+        db.execute(update(Job).where(Job.id == job_id).values(status="running", attempts=1))
+        db.commit()
+
+    assert job_runner.pending() == [job_id]
+    job_runner.run(job_id)
+
+    with WriteSession() as db:
+        job = db.get(Job, job_id)
+        assert (job.status, job.attempts) == ("succeeded", 2)
+        assert db.get(Tournament, completed_tournament_id).status == "completed"
+        assert _scores(db) == scores == _ledger_totals(db)
+
+def test_failed_job_records_its_error_and_keeps_no_changes(api):
+    _, WriteSession = api
+    runner = JobRunner(WriteSession)
+
+    def handler(db, payload):
+        db.execute(update(Player).where(Player.id == payload["player_id"]).values(score=Player.score + 100))
+        raise ValueError("scores out of date")
+
+    runner.register("failing", handler)
+    with WriteSession() as db:
+        scores = _scores(db)
+        job_id = runner.submit(db, "failing", "failing:1", {"player_id": 1}).id
+
+    runner.run(job_id)
+
+    with WriteSession() as db:
+        job = db.get(Job, job_id)
+        assert (job.status, job.error) == ("failed", "scores out of date")
+        assert job.finished_at is not None
+        assert _scores(db) == scores
+
+def test_only_expired_leases_are_queued_again(api, completed_tournament_id):
+    client, WriteSession = api
+    _reopened(client, WriteSession, completed_tournament_id)
+    job_id = client.put(f"/api/tournaments/{completed_tournament_id}/complete").json()["job_id"]
+    # Claimed by a live worker of another process
+    with WriteSession() as db:
+        db.execute(update(Job).where(Job.id == job_id).values(
+            status="running", attempts=1, owner="other", lease_expires_at=datetime.now() + timedelta(minutes=5)
+        ))
+        db.commit()
+
+    # Starting up does not take the job over, nor run it twice
+    assert job_runner.pending() == []
+    job_runner.run(job_id)
+    with WriteSession() as db:
+        assert (db.get(Job, job_id).status, db.get(Job, job_id).owner) == ("running", "other")
+        # The other worker stopped and its lease ran out
+        db.execute(update(Job).where(Job.id == job_id).values(lease_expires_at=datetime.now() - timedelta(seconds=1)))
+        db.commit()
+
+    assert job_runner.pending() == [job_id]
+    job_runner.run(job_id)
+    with WriteSession() as db:
+        job = db.get(Job, job_id)
+        assert (job.status, job.attempts, job.owner, job.lease_expires_at) == ("succeeded", 2, job_runner.owner, None)
@@ -0,0 +1,45 @@
+import asyncio
+import orjson
+from app.live import MatchFeed, live_feed
+from app.models import Match
+
+def _decode(message):
+    event, data = message.decode().rstrip("\n").split("\n")
+    return event.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))
+
+def test_match_update_is_pushed_to_the_tournament_subscribers(api, completed_tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        (match_id,) = db.query(Match.id).filter(Match.tournament_id == completed_tournament_id).first()
+
+    async def watch():
+        queue = live_feed.subscribe(completed_tournament_id)
+        other = live_feed.subscribe(completed_tournament_id + 1)
+        try:
+            # The endpoint runs in another thread, as in the threadpool
+            response = await asyncio.to_thread(client.put, f"/api/matches/{match_id}", json={"score": "7-6, 7-6"})
+            assert response.status_code == 200
+            message = await asyncio.wait_for(queue.get(), timeout=5)
+            assert other.empty()
+            return message
+        finally:
+            live_feed.unsubscribe(completed_tournament_id, queue)
+            live_feed.unsubscribe(completed_tournament_id + 1, other)
+
+    event, rows = _decode(asyncio.run(watch()))
+    assert event == "matches"
+    assert [(row["id"], row["score"]) for row in rows] == [(match_id, "7-6, 7-6")]
+    assert not live_feed.has_subscribers(completed_tournament_id)
+
+def test_slow_subscriber_keeps_the_latest_updates():
+    feed = MatchFeed(queue_size=2)
+
+    async def publish_three():
+        queue = feed.subscribe(1)
+        for score in ("6-0", "6-1", "6-2"):
+            feed.publish(1, "matches", [{"id": 1, "score": score}])
+        await asyncio.sleep(0)
+        assert feed.subscriber_count(1) == 1
+        return [_decode(queue.get_nowait())[1][0]["score"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(publish_three()) == ["6-1", "6-2"]
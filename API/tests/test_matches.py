@@ -0,0 +1,58 @@
+from datetime import datetime
+from sqlalchemy import func
+from app.models import Match, Phase, Referee, Tournament
+
+def _match(phase_id, referee_id, player1_id=1, player2_id=2, court_number=1):
+    return {
+        "player1_id": player1_id, "player2_id": player2_id, "referee_id": referee_id, "phase_id": phase_id,
+        "match_date": "2030-01-01T10:00:00", "court_number": court_number, "status": "scheduled",
+    }
+
+def test_bulk_creation_inserts_the_valid_matches_and_reports_the_others(api, upcoming_tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        top_level = db.query(func.max(Referee.level)).scalar()
+        (qualified,) = db.query(Referee.id).filter(Referee.level == top_level).first()
+        (unqualified,) = db.query(Referee.id).filter(Referee.level < top_level).first()
+        db.get(Tournament, upcoming_tournament_id).min_referee_level = top_level
+        phase = Phase(tournament_id=upcoming_tournament_id, name="First Round",
+                      start_date=datetime(2030, 1, 1), end_date=datetime(2030, 1, 2))
+        db.add(phase)
+        db.commit()
+        phase_id = phase.id
+        (other_phase_id,) = db.query(Phase.id).filter(Phase.tournament_id != upcoming_tournament_id).first()
+
+    response = client.post(f"/api/tournaments/{upcoming_tournament_id}/matches:bulk", json={"matches": [
+        _match(phase_id, qualified, 1, 2, court_number=1),
+        _match(other_phase_id, qualified),
+        _match(phase_id, qualified, 1, 999999),
+        _match(phase_id, 999999),
+        _match(phase_id, unqualified),
+        _match(phase_id, qualified, 3, 4, court_number=2),
+    ]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["errors"] == [
+        {"index": 1, "detail": "Invalid phase"},
+        {"index": 2, "detail": "One or both players not found"},
+        {"index": 3, "detail": "Referee not found"},
+        {"index": 4, "detail": "Referee level too low for this tournament"},
+    ]
+    assert [created["index"] for created in body["created"]] == [0, 5]
+
+    with WriteSession() as db:
+        # Each reported id is the match of its index in the request
+        for created, players in zip(body["created"], [(1, 2), (3, 4)]):
+            match = db.get(Match, created["match_id"])
+            assert (match.tournament_id, match.phase_id) == (upcoming_tournament_id, phase_id)
+            assert (match.player1_id, match.player2_id) == players
+        assert db.query(Match).filter(Match.tournament_id == upcoming_tournament_id).count() == 2
+
+    # Listed under their phase right away
+    listed = client.get(f"/api/tournaments/{upcoming_tournament_id}/matches").json()["matches"]
+    assert {match["id"] for match in listed["First Round"]} == {created["match_id"] for created in body["created"]}
+
+def test_bulk_creation_for_an_unknown_tournament(api):
+    client, _ = api
+    response = client.post("/api/tournaments/999999/matches:bulk", json={"matches": []})
+    assert response.status_code == 404
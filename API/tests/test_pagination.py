@@ -0,0 +1,49 @@
+def _walk(client, path, limit, **params):
+    """Every page of a list endpoint, following X-Next-After; returns (rows, page count)."""
+    rows, pages = [], 0
+    params["limit"] = limit
+    while True:
+        response = client.get(path, params=params)
+        assert response.status_code == 200, response.text
+        rows += response.json()
+        pages += 1
+        if "X-Next-After" not in response.headers:
+            return rows, pages
+        params["after"] = response.headers["X-Next-After"]
+
+def test_tournament_pages_cover_the_list_once(api):
+    client, _ = api
+    everything = client.get("/api/tournaments").json()
+    assert "X-Next-After" not in client.get("/api/tournaments").headers
+
+    rows, pages = _walk(client, "/api/tournaments", 7)
+    assert rows == everything
+    assert pages == len(everything) // 7 + 1
+    # A full last page still announces a cursor, which then returns nothing
+    assert _walk(client, "/api/tournaments", len(everything))[1] == 2
+
+def test_ranking_pages_follow_the_positions(api):
+    client, _ = api
+    everything = client.get("/api/players/rankings").json()
+    assert [row["ranking"] for row in everything] == list(range(1, len(everything) + 1))
+    assert _walk(client, "/api/players/rankings", 30)[0] == everything
+
+    # Filtered rankings are renumbered, and their pages are still cut on the stored positions
+    filtered = client.get("/api/players/rankings", params={"court_type": "clay"}).json()
+    assert 0 < len(filtered) < len(everything)
+    assert [row["ranking"] for row in filtered] == list(range(1, len(filtered) + 1))
+    assert _walk(client, "/api/players/rankings", 9, court_type="clay")[0] == filtered
+
+def test_fields_projection(api):
+    client, _ = api
+    tournaments = client.get("/api/tournaments", params={"fields": "name, status", "limit": 3}).json()
+    # The id is always there: it is the cursor
+    assert [set(row) for row in tournaments] == [{"id", "name", "status"}] * 3
+
+    rankings = client.get("/api/players/rankings", params={"fields": "name,ranking", "limit": 3}).json()
+    assert [set(row) for row in rankings] == [{"id", "name", "ranking"}] * 3
+    assert [row["ranking"] for row in rankings] == [1, 2, 3]
+
+    response = client.get("/api/tournaments", params={"fields": "name,password"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
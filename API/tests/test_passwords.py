@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from app.models import User
+from app.passwords import PasswordHasher, PasswordHasherBusy, hash_password_sync, password_hasher
+
+def test_calls_beyond_max_pending_are_rejected():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+
+    async def hash_two():
+        first = asyncio.ensure_future(hasher.hash("secret"))
+        # Let the first call take the only place
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("other")
+        return await first
+
+    stored = asyncio.run(hash_two())
+    assert asyncio.run(hasher.verify("secret", stored)) == (True, False)
+    stats = hasher.stats()
+    assert (stats["pending"], stats["completed"], stats["rejected"]) == (0, 2, 1)
+
+def test_full_hasher_answers_503_without_side_effects(api, monkeypatch):
+    client, WriteSession = api
+    with WriteSession() as db:
+        user = db.query(User).order_by(User.id).first()
+        user.password = hash_password_sync("secret", rounds=4)
+        db.commit()
+        email, user_type = user.email, user.user_type.value
+
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = client.post("/api/teams/register", data={"name": "Busy", "email": "busy@example.com", "password": "pw"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    response = client.post("/api/login", data={"email": email, "password": "secret", "user_type": user_type})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    with WriteSession() as db:
+        assert db.query(User).filter(User.email == "busy@example.com").count() == 0
+
+    # Once there is room again the same login goes through
+    monkeypatch.setattr(password_hasher, "max_pending", 64)
+    response = client.post("/api/login", data={"email": email, "password": "secret", "user_type": user_type})
+    assert response.status_code == 200, response.text
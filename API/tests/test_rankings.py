@@ -0,0 +1,43 @@
+import random
+import pytest
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import Session
+from app import rankings
+from app.models import Base, Player, PlayerRank
+
+def _ranking(db):
+    return db.execute(select(PlayerRank.player_id, PlayerRank.position, PlayerRank.score).order_by(PlayerRank.player_id)).all()
+
+def _recomputed(db):
+    score = func.coalesce(Player.score, 0)
+    return db.execute(
+        select(Player.id, func.row_number().over(order_by=(score.desc(), Player.id)), score).order_by(Player.id)
+    ).all()
+
+@pytest.mark.parametrize("player_cost_rows", [0, rankings.PLAYER_COST_ROWS])
+def test_score_changes_keep_the_ranking_of_a_full_rebuild(monkeypatch, player_cost_rows):
+    # With no cost per player every batch takes the incremental path
+    monkeypatch.setattr(rankings, "PLAYER_COST_ROWS", player_cost_rows)
+    rng = random.Random(7)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        # Few distinct scores, so that most moves cross ties
+        db.execute(insert(Player), [
+            {"id": i, "name": f"p{i}", "level": 1, "score": rng.choice([0, 0, 5, 10, 25, 100]), "team_id": 1}
+            for i in range(1, 301)
+        ])
+        rankings.rebuild_rankings(db)
+        next_id = 1000
+        for _ in range(60):
+            ids = rng.sample(range(1, 301), rng.choice([1, 2, 5, 16]))
+            for player_id in ids:
+                db.execute(update(Player).where(Player.id == player_id)
+                           .values(score=Player.score + rng.choice([-25, -5, 5, 10, 100])))
+            # A player without a ranking row yet
+            db.execute(insert(Player).values(id=next_id, name="new", level=1, score=rng.choice([0, 10]), team_id=1))
+            ids.append(next_id)
+            next_id += 1
+
+            rankings.apply_score_changes(db, ids)
+            assert _ranking(db) == _recomputed(db)
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import update
+from app.cache import create_cache_backend
+from app.models import Referee
+from app.references import RefereeRef, ReferenceCache
+
+@pytest.mark.parametrize("backend", ["local", "sqlite"])
+def test_rows_are_served_from_the_cache_until_invalidated(api, tmp_path, backend):
+    _, WriteSession = api
+    cache = ReferenceCache(create_cache_backend(backend, maxsize=100, ttl=None, path=str(tmp_path / "cache.db")))
+    with WriteSession() as db:
+        referee = cache.referee(db, 1)
+        assert isinstance(referee, RefereeRef)
+        db.execute(update(Referee).where(Referee.id == 1).values(level=Referee.level + 1))
+        db.commit()
+
+        # Changed behind the cache's back: still the stored snapshot
+        assert cache.referee(db, 1) == referee
+        cache.invalidate("referee", 1)
+        assert cache.referee(db, 1).level == referee.level + 1
+
+        # Missing rows are looked up every time
+        assert cache.referee(db, 999999) is None
+        assert cache.referee(db, 999999) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+
+def test_endpoints_invalidate_what_they_change(api):
+    client, _ = api
+    before = client.get("/api/referees/1").json()
+    assert client.put("/api/referees/1/score", json={"score": before["score"] + 5}).status_code == 200
+    assert client.get("/api/referees/1").json()["score"] == before["score"] + 5
+
+    assert client.delete("/api/referees/1").status_code == 200
+    assert client.get("/api/referees/1").status_code == 404
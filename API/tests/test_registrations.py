@@ -0,0 +1,123 @@
+import threading
+import pytest
+from sqlalchemy import func, update
+from app.models import Player, Team, TeamTournament, Tournament, TournamentRegistration
+from app.registrations import register_players
+
+@pytest.fixture
+def tournament_id(upcoming_tournament_id):
+    return upcoming_tournament_id
+
+def _free_team_players(db, tournament_id, count, other_than=None):
+    """(team_id, player_ids) of an unblocked team with `count` players not registered for the tournament yet."""
+    registered = db.query(TournamentRegistration.player_id).filter(TournamentRegistration.tournament_id == tournament_id)
+    for (team_id,) in db.query(Team.id).filter(Team.is_blocked.is_(False), Team.id != other_than).order_by(Team.id):
+        player_ids = [player_id for (player_id,) in db.query(Player.id).filter(
+            Player.team_id == team_id, Player.id.notin_(registered)
+        ).order_by(Player.id).limit(count)]
+        if len(player_ids) == count:
+            return team_id, player_ids
+    raise LookupError("no team with enough free players")
+
+def _registrations(db, tournament_id):
+    return db.query(TournamentRegistration).filter(TournamentRegistration.tournament_id == tournament_id).count()
+
+def _assert_counts_consistent(db, tournament_id):
+    assert db.get(Tournament, tournament_id).registered_count == _registrations(db, tournament_id)
+    per_team = dict(
+        db.query(Player.team_id, func.count())
+        .join(TournamentRegistration, TournamentRegistration.player_id == Player.id)
+        .filter(TournamentRegistration.tournament_id == tournament_id).group_by(Player.team_id)
+    )
+    assert dict(db.query(TeamTournament.team_id, TeamTournament.players)
+                .filter(TeamTournament.tournament_id == tournament_id)) == per_team
+
+def _register(client, tournament_id, team_id, player_ids):
+    return client.post(f"/api/tournaments/{tournament_id}/register-team",
+                       json={"team_id": team_id, "player_ids": player_ids})
+
+def test_registering_a_player_twice_is_rejected(api, tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        team_id, player_ids = _free_team_players(db, tournament_id, 2)
+        before = _registrations(db, tournament_id)
+
+    assert _register(client, tournament_id, team_id, player_ids[:1]).status_code == 200
+    # The same player again, alongside a new one: nothing of the request is kept
+    response = _register(client, tournament_id, team_id, player_ids)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Some players are already registered for this tournament"
+    # A player listed twice in one request is registered once
+    assert _register(client, tournament_id, team_id, [player_ids[1], player_ids[1]]).status_code == 200
+
+    with WriteSession() as db:
+        assert _registrations(db, tournament_id) == before + 2
+        _assert_counts_consistent(db, tournament_id)
+
+def test_registration_beyond_capacity_is_rejected(api, tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        team_id, player_ids = _free_team_players(db, tournament_id, 2)
+        db.execute(update(Tournament).where(Tournament.id == tournament_id)
+                   .values(capacity=Tournament.registered_count + 1))
+        db.commit()
+        before = _registrations(db, tournament_id)
+
+    response = _register(client, tournament_id, team_id, player_ids)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough free places left in this tournament"
+    assert _register(client, tournament_id, team_id, player_ids[:1]).status_code == 200
+
+    with WriteSession() as db:
+        assert _registrations(db, tournament_id) == before + 1 == db.get(Tournament, tournament_id).capacity
+        _assert_counts_consistent(db, tournament_id)
+
+def test_blocked_team_and_foreign_players_are_rejected(api, tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        team_id, player_ids = _free_team_players(db, tournament_id, 1)
+        other_team_id, other_ids = _free_team_players(db, tournament_id, 1, other_than=team_id)
+        db.execute(update(Team).where(Team.id == other_team_id).values(is_blocked=True))
+        db.commit()
+        before = _registrations(db, tournament_id)
+
+    response = _register(client, tournament_id, team_id, player_ids + [other_ids[0]])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Some players do not belong to the team"
+    assert _register(client, tournament_id, other_team_id, other_ids).status_code == 403
+
+    with WriteSession() as db:
+        assert _registrations(db, tournament_id) == before
+        _assert_counts_consistent(db, tournament_id)
+
+def test_concurrent_registrations_never_pass_capacity(api, tournament_id):
+    _, WriteSession = api
+    with WriteSession() as db:
+        team_id, player_ids = _free_team_players(db, tournament_id, 6)
+        tournament = db.get(Tournament, tournament_id)
+        tournament.capacity = tournament.registered_count + 3
+        db.commit()
+        capacity = tournament.capacity
+
+    # Each player submitted twice, six different players for three places
+    results = []
+
+    def submit(player_id):
+        with WriteSession() as db:
+            if register_players(db, tournament_id, team_id, [player_id]):
+                db.commit()
+                results.append(player_id)
+            else:
+                db.rollback()
+
+    threads = [threading.Thread(target=submit, args=(player_id,)) for player_id in player_ids * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 3
+    assert len(set(results)) == 3
+    with WriteSession() as db:
+        assert _registrations(db, tournament_id) == capacity
+        _assert_counts_consistent(db, tournament_id)
@@ -0,0 +1,116 @@
+from collections import Counter
+from sqlalchemy import func, select, update
+from app import rankings
+from app.jobs import job_runner
+from app.models import Match, Phase, Player, PlayerRank, Referee, ScoreEvent, Tournament
+from app.scoring import SUBJECTS, rebuild_score_events
+
+def _scores(db):
+    return {subject_type: dict(db.query(model.id, model.score)) for subject_type, model in SUBJECTS.items()}
+
+def _ledger(db):
+    return Counter(db.query(ScoreEvent.tournament_id, ScoreEvent.match_id, ScoreEvent.subject_type,
+                            ScoreEvent.subject_id, ScoreEvent.points).tuples())
+
+def _assert_consistent(db):
+    """Totals are the sums of the ledger, and the ranking follows the player totals."""
+    for subject_type, model in SUBJECTS.items():
+        ledger = dict(
+            db.query(ScoreEvent.subject_id, func.sum(ScoreEvent.points))
+            .filter(ScoreEvent.subject_type == subject_type).group_by(ScoreEvent.subject_id)
+        )
+        assert {subject_id: score for subject_id, score in db.query(model.id, model.score)} == \
+            {subject_id: ledger.get(subject_id, 0) for (subject_id,) in db.query(model.id)}
+
+    score = func.coalesce(Player.score, 0)
+    recomputed = db.execute(
+        select(Player.id, func.row_number().over(order_by=(score.desc(), Player.id)), score).order_by(Player.id)
+    ).all()
+    assert db.execute(
+        select(PlayerRank.player_id, PlayerRank.position, PlayerRank.score).order_by(PlayerRank.player_id)
+    ).all() == recomputed
+
+def test_reopen_then_complete_restores_the_scores(api, completed_tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        before = _scores(db)
+        _assert_consistent(db)
+
+    response = client.put(f"/api/tournaments/{completed_tournament_id}/reopen")
+    assert response.status_code == 200
+    assert response.json()["players"] > 0
+    with WriteSession() as db:
+        assert db.get(Tournament, completed_tournament_id).status == "active"
+        assert db.query(ScoreEvent).filter(ScoreEvent.tournament_id == completed_tournament_id).count() == 0
+        assert _scores(db) != before
+        _assert_consistent(db)
+
+    job_runner.run(client.put(f"/api/tournaments/{completed_tournament_id}/complete").json()["job_id"])
+    with WriteSession() as db:
+        assert db.get(Tournament, completed_tournament_id).status == "completed"
+        assert _scores(db) == before
+        _assert_consistent(db)
+
+def test_rescore_after_a_winner_change_moves_only_the_difference(api, completed_tournament_id):
+    client, WriteSession = api
+    with WriteSession() as db:
+        final = db.query(Match).join(Phase, Match.phase_id == Phase.id) \
+            .filter(Match.tournament_id == completed_tournament_id, Phase.name == "FINAL").one()
+        winner, runner_up = final.winner_id, (final.player2_id if final.winner_id == final.player1_id else final.player1_id)
+        before = _scores(db)
+        # A corrected result: the runner-up won the final
+        final.winner_id = runner_up
+        db.commit()
+
+    response = client.put(f"/api/tournaments/{completed_tournament_id}/rescore")
+    assert response.status_code == 200
+    assert response.json()["players"] == 2
+    assert response.json()["referees"] == 0
+
+    with WriteSession() as db:
+        after = _scores(db)
+        # The final pays 100 to the winner and 60 to the runner-up
+        assert after["player"][winner] == before["player"][winner] - 40
+        assert after["player"][runner_up] == before["player"][runner_up] + 40
+        assert {k: v for k, v in after["player"].items() if k not in (winner, runner_up)} == \
+            {k: v for k, v in before["player"].items() if k not in (winner, runner_up)}
+        assert after["referee"] == before["referee"]
+        _assert_consistent(db)
+
+    # Nothing left to change
+    assert client.put(f"/api/tournaments/{completed_tournament_id}/rescore").json()["players"] == 0
+
+def test_rebuild_score_events_keeps_totals_with_opening_balances(api):
+    _, WriteSession = api
+    with WriteSession() as db:
+        # Points that no tournament explains, as on a database older than the ledger
+        db.execute(update(Player).where(Player.id == 1).values(score=Player.score + 7))
+        db.execute(update(Referee).where(Referee.id == 1).values(score=Referee.score - 3))
+        rankings.apply_score_changes(db, [1])
+        before = _scores(db)
+
+        rebuild_score_events(db)
+        db.commit()
+
+        assert _scores(db) == before
+        tournament_credits = db.query(func.sum(ScoreEvent.points)) \
+            .filter(ScoreEvent.subject_type == "player", ScoreEvent.subject_id == 1,
+                    ScoreEvent.tournament_id.isnot(None)).scalar() or 0
+        opening = db.query(ScoreEvent.points, ScoreEvent.awarded_at) \
+            .filter(ScoreEvent.subject_type == "player", ScoreEvent.subject_id == 1,
+                    ScoreEvent.tournament_id.is_(None)).one()
+        assert opening == (before["player"][1] - tournament_credits, None)
+
+        # Only completed tournaments are in the ledger, each dated by its end
+        completed = {tournament_id for (tournament_id,) in db.query(Tournament.id).filter(Tournament.status == "completed")}
+        dated = db.query(ScoreEvent.tournament_id, ScoreEvent.awarded_at, Tournament.end_date) \
+            .join(Tournament, Tournament.id == ScoreEvent.tournament_id).all()
+        assert {tournament_id for tournament_id, _, _ in dated} == completed
+        assert all(awarded_at == end_date for _, awarded_at, end_date in dated)
+
+        # Rebuilding twice gives the same ledger
+        ledger = _ledger(db)
+        rebuild_score_events(db)
+        db.commit()
+        assert _ledger(db) == ledger
+        _assert_consistent(db)
@@ -0,0 +1,24 @@
+from sqlalchemy import update
+from app import main
+from app.cache import create_cache_backend
+from app.models import Match
+
+def test_bracket_snapshot_follows_updates_made_by_another_worker(api, tmp_path, monkeypatch):
+    client, WriteSession = api
+    path = str(tmp_path / "cache.db")
+    # This worker's backend, and another worker's on the same file
+    monkeypatch.setattr(main, "match_snapshots", create_cache_backend("sqlite", maxsize=100, ttl=300, path=path))
+    other_worker = create_cache_backend("sqlite", maxsize=100, ttl=300, path=path)
+
+    first = client.get("/api/tournaments/1/matches").json()
+    match = first["matches"]["FINAL"][0]
+
+    # The other worker updates the final and signals it the way matches_changed does
+    with WriteSession() as db:
+        db.execute(update(Match).where(Match.id == match["id"]).values(score="7-6, 7-6"))
+        db.commit()
+    assert client.get("/api/tournaments/1/matches").json() == first
+    other_worker.bump(main._snapshot_key(1))
+
+    refreshed = client.get("/api/tournaments/1/matches").json()
+    assert refreshed["matches"]["FINAL"][0]["score"] == "7-6, 7-6"
@@ -0,0 +1,16 @@
+from datetime import datetime
+import pytest
+from app.models import Tournament
+from app.synthetic import COLUMNS, SyntheticDataset
+
+@pytest.mark.parametrize("draw_size", [4, 8, 16])
+def test_registrations_fit_the_draw(draw_size):
+    rows = SyntheticDataset(
+        teams=4, players_per_team=10, referees=10, tournaments=60,
+        draw_size=draw_size, completed_ratio=0.5, seed=3, start_date=datetime(2023, 1, 2)
+    ).build()
+    columns = COLUMNS[Tournament]
+    registered, capacity = columns.index("registered_count"), columns.index("capacity")
+    for row in rows[Tournament]:
+        assert row[capacity] == draw_size
+        assert row[registered] <= row[capacity]
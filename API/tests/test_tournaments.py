@@ -0,0 +1,24 @@
+import pytest
+from app.config import settings
+from app.models import Tournament
+
+def _tournament(**fields):
+    return {
+        "name": "Capacity Open", "edition": "2030", "start_date": "2030-03-01T09:00:00",
+        "end_date": "2030-03-08T18:00:00", "min_level": 1, "min_referee_level": 1, "court_type": "clay",
+        **fields,
+    }
+
+@pytest.mark.parametrize("capacity", [0, -3])
+def test_tournament_capacity_must_be_positive(api, capacity):
+    client, _ = api
+    response = client.post("/api/tournaments", json=_tournament(capacity=capacity))
+    assert response.status_code == 422
+
+@pytest.mark.parametrize("fields, expected", [({}, settings.TOURNAMENT_CAPACITY), ({"capacity": 5}, 5)])
+def test_tournament_capacity_defaults_to_setting(api, fields, expected):
+    client, WriteSession = api
+    response = client.post("/api/tournaments", json=_tournament(**fields))
+    assert response.status_code == 200, response.text
+    with WriteSession() as db:
+        assert db.get(Tournament, response.json()["tournament_id"]).capacity == expected
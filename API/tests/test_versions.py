@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine
+from app import migrations
+from app.cache import create_cache_backend
+from app.models import Base, ScoreEvent
+from app.versions import ResourceVersions
+
+def test_sqlite_backend_shares_table_versions_between_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    # Two workers, each with its own connection to the shared file
+    writer = ResourceVersions(create_cache_backend("sqlite", maxsize=10, ttl=60, path=path))
+    reader = ResourceVersions(create_cache_backend("sqlite", maxsize=10, ttl=60, path=path))
+
+    before, _ = reader.snapshot(("tournaments", "matches"))
+    writer.bump(["matches"])
+    after, modified = reader.snapshot(("tournaments", "matches"))
+
+    assert after != before
+    assert after == writer.snapshot(("tournaments", "matches"))[0]
+    assert modified == reader.stats()["tables"]["matches"]["modified"]
+    # Untouched tables keep their tag
+    assert reader.snapshot(("tournaments",))[0] == writer.snapshot(("tournaments",))[0]
+
+def test_rotation_retires_tags_in_every_worker(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResourceVersions(create_cache_backend("sqlite", maxsize=10, ttl=60, path=path))
+    reader = ResourceVersions(create_cache_backend("sqlite", maxsize=10, ttl=60, path=path))
+
+    before, _ = reader.snapshot(("tournaments",))
+    # e.g. a reseed from another process: no table counter moved
+    writer.rotate()
+    after, _ = reader.snapshot(("tournaments",))
+
+    assert after != before
+    assert reader.stats()["rotation"] == 1
+
+def test_schema_upgrade_rotates_only_when_it_rewrites_rows(tmp_path, monkeypatch):
+    versions = ResourceVersions(create_cache_backend("local", maxsize=10, ttl=60))
+    monkeypatch.setattr(migrations, "resource_versions", versions)
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+
+    migrations.upgrade_schema(engine)
+    assert versions.stats()["rotation"] == 0
+
+    # A database from before the score ledger: the upgrade fills it from raw SQL
+    ScoreEvent.__table__.drop(engine)
+    migrations.upgrade_schema(engine)
+    assert versions.stats()["rotation"] == 1
+    engine.dispose()